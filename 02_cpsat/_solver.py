@@ -1,5 +1,16 @@
+import os
+import sys
+
 from ortools.sat.python import cp_model
 import itertools
+import time
+
+# The modules shared by all sheets live in the package 'alglab' at the repository root.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from alglab.warm_start import tour_successors, hint_tour
 
 
 def squared_distance(p1, p2):
@@ -20,12 +31,25 @@ class BTSPSolverCP:
                           for (i, j) in itertools.permutations(range(len(self.points)), 2)}
         self.max_distance = max(self.distances.values())
 
+    def __arc_limit(self):
+        """
+        The largest squared length of an arc that can be in an optimal tour: arcs above
+        a known feasible bottleneck (upper_bound) are never needed.
+        """
+        if self.upper_bound is None:
+            return self.max_distance
+        # the squared lengths are integers, the factor only absorbs the rounding of the square root
+        return self.upper_bound ** 2 * (1 + 1e-12)
+
     def __make_vars(self):
         """
         Create all involved variables and set the minimization objective.
+        Only arcs up to the upper bound get a variable.
         """
+        limit = self.__arc_limit()
         self.edge_vars = {(v, w): self.model.NewBoolVar(f'x_{v},{w}')
-                          for v, w in itertools.permutations(range(self.n), 2)}
+                          for (v, w), d in self.distances.items() if d <= limit}
+        self.max_distance = max(self.distances[e] for e in self.edge_vars)
         self.bottleneck_var = self.model.NewIntVar(0, self.max_distance, 'b')
         self.depth_vars = {v: self.model.NewIntVar(0, self.n - 1, f'd_{v}') for v in range(self.n)}
         self.model.Minimize(self.bottleneck_var)
@@ -35,15 +59,33 @@ class BTSPSolverCP:
         Add the (redundant) constraints x_{v,w} -> !x_{w, v}.
         """
         for v, w in itertools.combinations(range(self.n), 2):
-            self.model.AddBoolOr([self.edge_vars[v, w].Not(), self.edge_vars[w, v].Not()])
+            if (v, w) in self.edge_vars and (w, v) in self.edge_vars:
+                self.model.AddBoolOr([self.edge_vars[v, w].Not(), self.edge_vars[w, v].Not()])
 
-    def __add_bottleneck_constraints(self):
-        """
-        Add the constraints to ensure that only edges as cheap or cheaper than 
-        the bottleneck can be selected (b >= d(v,w) * x_{v,w}).
-        """
-        for (v, w), x_vw in self.edge_vars.items():
-            self.model.Add(self.bottleneck_var >= self.distances[v, w] * x_vw)
+    def __add_threshold_encoding(self):
+        """
+        Ordered threshold encoding of the bottleneck: one literal t_k per distinct arc
+        length d_1 < d_2 < ..., meaning b >= d_k. t_k implies t_{k-1}, every arc of length
+        d_k implies t_k, and b is the sum of the steps d_k - d_{k-1} of the true literals.
+        This replaces the linear constraint b >= d(v,w) * x_{v,w} of every arc by a
+        single implication.
+        """
+        self.threshold_lengths = sorted(set(self.distances[e] for e in self.edge_vars))
+        self.threshold_vars = [self.model.NewBoolVar(f't_{k}') for k in range(len(self.threshold_lengths))]
+        rank = {d: k for k, d in enumerate(self.threshold_lengths)}
+        for k in range(1, len(self.threshold_vars)):
+            self.model.AddImplication(self.threshold_vars[k], self.threshold_vars[k - 1])
+        for e, x_e in self.edge_vars.items():
+            self.model.AddImplication(x_e, self.threshold_vars[rank[self.distances[e]]])
+        steps = [b - a for a, b in zip([0] + self.threshold_lengths[:-1], self.threshold_lengths)]
+        self.model.Add(self.bottleneck_var == cp_model.LinearExpr.WeightedSum(self.threshold_vars, steps))
+
+    def __report_model_size(self):
+        all_arcs = self.n * (self.n - 1)
+        self.stats.update(arcs=len(self.edge_vars), all_arcs=all_arcs, thresholds=len(self.threshold_vars),
+                          constraints=len(self.model.Proto().constraints))
+        print(f"Model: {len(self.edge_vars)} of {all_arcs} arcs ({100 * (1 - len(self.edge_vars) / all_arcs):.1f}% "
+              f"pruned), {len(self.threshold_vars)} thresholds, {self.stats['constraints']} constraints")
 
     def __add_degree_constraints(self):
         """
@@ -54,8 +96,9 @@ class BTSPSolverCP:
             # "Count" the number of incoming and outgoing edges.
             vin, vout = 0, 0
             for w in range(0, self.n):
-                if v != w:
+                if (w, v) in self.edge_vars:
                     vin += self.edge_vars[w, v]
+                if (v, w) in self.edge_vars:
                     vout += self.edge_vars[v, w]
             self.model.Add(vin == 1)  # exactly one incoming edge
             self.model.Add(vout == 1)  # exactly one outgoing edge
@@ -81,19 +124,41 @@ class BTSPSolverCP:
             else:
                 self.model.Add(self.depth_vars[w] == self.depth_vars[v] + 1).OnlyEnforceIf(x_vw)
 
-    def __init__(self, points):
+    def __init__(self, points, upper_bound=None):
         """
         Initialize the model.
+        :param upper_bound: Optional parameter. The bottleneck length of a known tour (e.g. from
+            heuristic_tour), all longer arcs are left out of the model.
         """
+        # Seconds spent per phase: distance table, model building, search and reading the solution.
+        self.stats = {'edges_time': 0.0, 'build_time': 0.0, 'solve_time': 0.0, 'extract_time': 0.0}
+        start = time.perf_counter()
         self.points = points
         self.n = len(self.points)
+        self.upper_bound = upper_bound
         self.model = cp_model.CpModel()
         self.__calculate_distances()
+        self.stats['edges_time'] = time.perf_counter() - start
+        start = time.perf_counter()
         self.__make_vars()
         self.__forbid_bidirectional_edges()
-        self.__add_bottleneck_constraints()
+        self.__add_threshold_encoding()
         self.__add_degree_constraints()
         self.__add_depth_constraints()
+        self.stats['build_time'] = time.perf_counter() - start
+        self.__report_model_size()
+
+    def warm_start(self, solution):
+        """
+        Hint a tour (list of edges, e.g. from heuristic_tour) to the solver:
+        the arcs along the tour, starting at point 0, the depths of the points and its bottleneck.
+        """
+        successor = tour_successors(self.points, solution)
+        hint_tour(self.model, self.edge_vars, successor, self.depth_vars)
+        bottleneck = max(self.distances[v, w] for v, w in successor.items())
+        self.model.AddHint(self.bottleneck_var, bottleneck)
+        for d, t in zip(self.threshold_lengths, self.threshold_vars):
+            self.model.AddHint(t, d <= bottleneck)
 
     def solve(self):
         """
@@ -101,9 +166,14 @@ class BTSPSolverCP:
         Returns the DBST edges as a list of coordinate tuple tuples ((x1,y1),(x2,y2)).
         """
         solver = cp_model.CpSolver()
+        start = time.perf_counter()
         status = solver.Solve(self.model)
+        self.stats['solve_time'] = time.perf_counter() - start
         if status == cp_model.INFEASIBLE:
             raise RuntimeError("The model was classified infeasible by the solver!")
         if status != cp_model.OPTIMAL:
             raise RuntimeError("Unexpected status after running solver!")
-        return [(self.points[v], self.points[w]) for (v, w), x_vw in self.edge_vars.items() if solver.Value(x_vw) != 0]
+        start = time.perf_counter()
+        solution = [(self.points[v], self.points[w]) for (v, w), x_vw in self.edge_vars.items() if solver.Value(x_vw) != 0]
+        self.stats['extract_time'] = time.perf_counter() - start
+        return solution
@@ -1,3 +1,11 @@
 from .util import Node, Edge, draw_edges
 
 from .solver import BTSPSolverSAT
+
+from alglab.isolation import run_isolated, run_many, IsolatedResult
+
+from alglab.heuristic import heuristic_tour
+
+from alglab.warm_start import warm_start_tour, SolutionCache
+
+from alglab.result_store import ResultStore
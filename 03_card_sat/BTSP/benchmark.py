@@ -1,34 +1,93 @@
-import signal
+import math
+import random
+import statistics
 import time
 from BTSP import *
+from alglab.isolation import run_isolated, TIMEOUT, OK
 
 
-def timeout(signum, frame):
-    print('Signal handler called with signal',
-          signum)
-    raise OSError("timeout exceeded!")
+def solve_reporting(report, points, degree=2, method=0, **solver_kwargs):
+    """
+    Solve with BTSPSolverSAT and report the best bottleneck after every improving solution.
+    This is the target for run_isolated, the partial result of a killed run is the last report.
+    """
+    solver = BTSPSolverSAT(points, degree, **solver_kwargs)
+    solution, sat_time = solver.solve(method, on_improvement=lambda bottleneck, _: report(
+        {'bottleneck': bottleneck, 'sat_time': solver.stats['sat_time']}))
+    return {'bottleneck': max(math.dist(*e) for e in solution), 'sat_time': sat_time}
 
 
-def benchmark_time(time_limit, start_points, step):
-    signal.signal(signal.SIGALRM, timeout)
+def benchmark_time(time_limit, start_points, step, candidates=None, store=None, seed=None, memory_limit=None):
+    """
+    Solve growing instances until one takes longer than time_limit seconds. Every solve runs
+    in a child process that is killed at the time limit (see isolation.run_isolated).
+    :param memory_limit: Optional limit of the memory of a solve in bytes.
+    :param store: Optional ResultStore. Sizes with a finished result in the store are not
+        solved again, new results are recorded. The instances are then seeded (seed 0 by default),
+        so a resumed run sees the same instances.
+    """
+    if store is not None and seed is None:
+        seed = 0
+    params = {'degree': 2, 'method': 0, 'candidates': candidates, 'time_limit': time_limit}
 
     num_points = start_points
-    try:
-        while True:
-            print(f'Points: {num_points}')
-            solver = BTSPSolverSAT(util.random_points(num_points), 2)
-            # Use binary search as it is most performant
-            signal.alarm(time_limit)
-            start = time.time()
-            solver.solve(0)
-            print(f'Time taken for {num_points} points: {time.time() - start}')
-            signal.alarm(0)
-            num_points += step
-    except OSError as e:
-        print(e)
+    start = time.time()
+    while True:
+        print(f'Points: {num_points}')
+        if seed is not None:
+            random.seed(f'{seed}/{num_points}')
+        points = util.random_points(num_points)
+        if store is not None:
+            instance = util.instance_hash(points)
+            result = store.result(instance, 'BTSPSolverSAT', params)
+            if result is not None:
+                print(f'Stored result for {num_points} points: {result["status"]}, {result["runtime"]}')
+                if result['status'] == 'timeout':
+                    break
+                num_points += step
+                continue
+        # Use binary search as it is most performant
+        start = time.time()
+        result = run_isolated(solve_reporting, (points, 2, 0), {'candidates': candidates},
+                              time_limit=time_limit, memory_limit=memory_limit)
+        if result.status != OK:
+            best = result.partial or {}
+            print(f'{result.status} at {num_points} points, best bottleneck so far: {best.get("bottleneck")}')
+            if result.error:
+                print(result.error)
+            if store is not None:
+                store.record(instance, 'BTSPSolverSAT', params, best.get('bottleneck'), result.runtime,
+                             best.get('sat_time'), 'timeout' if result.status == TIMEOUT else result.status)
+            break
+        print(f'Time taken for {num_points} points: {result.runtime}')
+        if store is not None:
+            store.record(instance, 'BTSPSolverSAT', params, result.value['bottleneck'],
+                         result.runtime, result.value['sat_time'], 'optimal')
+        num_points += step
 
     print(f'Biggest instance to solve in under {time_limit} sec: {num_points - step}, in {time.time() - start}')
     print(f'Failed at {num_points} points')
 
 
-benchmark_time(300, 615, 5)
+def benchmark_threshold_encoding(num_points, iterations, seed=0, candidates=None):
+    """
+    Compare the two threshold encodings of BTSPSolverSAT ('assumptions' and 'order')
+    with binary search on the same random instances.
+    """
+    random.seed(seed)
+    instances = [util.random_points(num_points) for _ in range(iterations)]
+    for encoding in ("assumptions", "order"):
+        sat_times, total_times = [], []
+        for points in instances:
+            start = time.time()
+            with util.suppress_stdout():
+                solver = BTSPSolverSAT(points, 2, candidates=candidates, threshold_encoding=encoding)
+                _, sat_time = solver.solve(0)
+            total_times.append(time.time() - start)
+            sat_times.append(sat_time)
+        print(f'Encoding {encoding}: average SAT time {statistics.mean(sat_times)}, '
+              f'average total time {statistics.mean(total_times)}')
+
+
+if __name__ == '__main__':
+    benchmark_time(300, 615, 5)
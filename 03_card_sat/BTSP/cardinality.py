@@ -0,0 +1,40 @@
+"""
+Clausal cardinality constraints for SAT backends without native support
+for them (e.g. Glucose or CaDiCaL, where add_atmost is not available).
+"""
+from typing import List, Tuple
+
+from pysat.card import CardEnc, EncType
+
+
+def atmost_clauses(lits: List[int], bound: int, top: int) -> Tuple[List[List[int]], int]:
+    """
+    Encode 'at most bound of lits are true' with a sequential counter.
+    Auxiliary variables are numbered above top, the new top is returned with the clauses.
+    """
+    encoding = CardEnc.atmost(lits, bound, top_id=top, encoding=EncType.seqcounter)
+    return encoding.clauses, max(top, encoding.nv)
+
+
+def atleast_clauses(lits: List[int], bound: int, top: int) -> Tuple[List[List[int]], int]:
+    """
+    Encode 'at least bound of lits are true' with a sequential counter, where
+    r[i][j] means 'at least j+1 of lits[0..i] are true'. Only the direction
+    r -> count is needed, which gives O(len(lits) * bound) clauses. pysat would
+    negate the constraint to 'at most len(lits) - bound', which is quadratic
+    for the small bounds of the degree constraints.
+    """
+    if bound <= 0:
+        return [], top
+    if len(lits) < bound:
+        return [[]], top
+    r = [[top + i * bound + j + 1 for j in range(bound)] for i in range(len(lits))]
+    clauses = [[-r[0][0], lits[0]]]
+    clauses += [[-r[0][j]] for j in range(1, bound)]
+    for i in range(1, len(lits)):
+        clauses.append([-r[i][0], r[i - 1][0], lits[i]])
+        for j in range(1, bound):
+            clauses.append([-r[i][j], r[i - 1][j], lits[i]])
+            clauses.append([-r[i][j], r[i - 1][j], r[i - 1][j - 1]])
+    clauses.append([r[-1][-1]])
+    return clauses, top + len(lits) * bound
@@ -0,0 +1,113 @@
+"""
+Portfolio search for the BTSP: several BTSPSolverSAT instances with different
+SAT backends and search strategies run on the same instance in a process pool.
+The workers share the best known bottleneck index and the largest index known
+to be infeasible, so every worker can continue from the tightest bounds of all.
+As soon as the bounds meet, the remaining workers are interrupted.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from util import Node, Edge, Iterable, suppress_stdout, as_node_set
+from solver import BTSPSolverSAT, SearchInterrupted
+
+# (backend, method) with the methods of BTSPSolverSAT.solve: 0 binary, 1 linear descending, 2 linear ascending.
+# The ascending search starts at the lower bound, which often already is the optimum.
+DEFAULT_PORTFOLIO = [("Gluecard4", 0), ("Glucose4", 0), ("Cadical153", 0), ("Minicard", 0),
+                     ("Gluecard4", 2), ("Minicard", 1)]
+
+# Shared state of the worker processes, set by _init_worker.
+_shared: Dict = {}
+
+
+def _init_worker(state, lock, done):
+    _shared.update(state=state, lock=lock, done=done)
+
+
+def _exchange(solver: BTSPSolverSAT, config: Tuple[str, int], lb: int, ub: int) -> Tuple[int, int]:
+    """
+    Merge the bounds of one worker with the shared ones. An improved upper bound
+    is published together with its solution, and meeting bounds end the portfolio.
+    """
+    state, done = _shared['state'], _shared['done']
+    with _shared['lock']:
+        if ub < state['ub'] or (ub == state['ub'] and state['solution'] is None and solver.best_solution is not None):
+            state.update(ub=ub, solution=solver.best_solution, found_by=config)
+        ub = state['ub']
+        lb = max(lb, state['lb'])
+        state['lb'] = lb
+        if lb >= ub - 1 and state['solution'] is not None and not done.is_set():
+            state['proved_by'] = config
+            done.set()
+    return lb, ub
+
+
+def _watch(solver: BTSPSolverSAT, finished: threading.Event):
+    """
+    Interrupt the solver once another worker finished the portfolio.
+    """
+    while not finished.is_set():
+        if _shared['done'].wait(0.05):
+            solver.interrupt()
+            return
+
+
+def _run_worker(points: List[Node], degree: int, backend: str, method: int, solver_kwargs: dict) -> bool:
+    """
+    Run one configuration of the portfolio. Returns False if it was interrupted.
+    """
+    if _shared['done'].is_set():
+        return False
+    with suppress_stdout():
+        solver = BTSPSolverSAT(points, degree, solver=backend, **solver_kwargs)
+    solver.bound_exchange = lambda lb, ub: _exchange(solver, (backend, method), lb, ub)
+    finished = threading.Event()
+    threading.Thread(target=_watch, args=(solver, finished), daemon=True).start()
+    try:
+        with suppress_stdout():
+            solver.solve(method)
+        return True
+    except SearchInterrupted:
+        return False
+    finally:
+        finished.set()
+
+
+def solve_portfolio(points: Iterable[Node], degree: int = 2, configs: List[Tuple[str, int]] = None,
+                    max_workers: Optional[int] = None, **solver_kwargs):
+    """
+    Solve the instance with every (backend, method) configuration in parallel.
+    Backends without limited solving (CaDiCaL) cannot be interrupted inside a
+    SAT call, they stop at their next probe.
+    :param points: The set of points as (x,y)-tuples, or an (n, 2) coordinate array.
+    :param degree: The maximum degree of a node.
+    :param configs: List of (backend, method), see DEFAULT_PORTFOLIO.
+    :param max_workers: Number of processes, one per configuration by default.
+    :param solver_kwargs: Further arguments for BTSPSolverSAT, e.g. candidates='knn'.
+    :return: The best solution (as list of edges) and the configurations that found
+        and proved it, as dict with the keys 'found_by' and 'proved_by'.
+    """
+    if not isinstance(points, np.ndarray):
+        points = sorted(as_node_set(points))  # the same point order in every worker
+    configs = configs or DEFAULT_PORTFOLIO
+    m = len(points) * (len(points) - 1) // 2
+    with multiprocessing.Manager() as manager:
+        state = manager.dict(lb=-1, ub=m - 1, solution=None, found_by=None, proved_by=None)
+        lock, done = manager.Lock(), manager.Event()
+        with ProcessPoolExecutor(max_workers or len(configs), initializer=_init_worker,
+                                 initargs=(state, lock, done)) as pool:
+            pending = {pool.submit(_run_worker, points, degree, backend, method, solver_kwargs)
+                       for backend, method in configs}
+            while pending and not done.is_set():
+                finished, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    future.result()  # raise errors of the workers
+            done.set()  # cancel the remaining workers
+            for future in pending:
+                future.cancel()
+        solution: Optional[List[Edge]] = state['solution']
+        return solution, {'found_by': state['found_by'], 'proved_by': state['proved_by']}
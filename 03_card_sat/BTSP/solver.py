@@ -1,8 +1,31 @@
 from pysat.solvers import Solver
-import networkx as nx
+import numpy as np
 import math
+import threading
+import time
+from typing import Callable, NamedTuple
 
-from util import Node, Edge, Iterable, List, Set, Optional, all_edges_sorted
+from util import Node, Edge, Iterable, List, Set, Tuple, Optional, EdgeIndex
+from alglab.candidates import candidate_mask, knn_mask, solution_positions, shortest_crossing_edges
+from alglab.bounds import lower_bound_index
+from alglab.connectivity import ThresholdConnectivity, selected_positions, components_of
+from alglab.cuts import CutGenerator
+from alglab.cut_store import CutStore
+from cardinality import atmost_clauses, atleast_clauses
+
+
+class SearchInterrupted(Exception):
+    """
+    Raised by the searches of BTSPSolverSAT after interrupt() was called.
+    """
+
+
+class SearchResult(NamedTuple):
+    solution: Optional[List[Edge]]  # the best tour found, None if there is none yet
+    bottleneck: Optional[float]  # its bottleneck length
+    lower_bound: float  # proven lower bound for the optimal bottleneck length
+    gap: Optional[float]  # (bottleneck - lower_bound) / bottleneck, 0 if the solution is optimal
+    optimal: bool
 
 
 class BTSPSolverSAT:
@@ -14,8 +37,13 @@ class BTSPSolverSAT:
         # Map every undirected edge to an integer >= 1. This integer is both
         # used for encoding SAT clauses and for fetching the index/position
         # in the sorted edges (+1). The latter is important when handling the
-        # bottleneck
-        self.edge_to_var = {edge: i for i, edge in enumerate(self.all_edges, start=1)}
+        # bottleneck. Only the active edges get a variable (all edges, unless a
+        # candidate set is used).
+        active = np.flatnonzero(self.active)
+        self.active_positions = active
+        nodes = self.edge_index.nodes
+        self.edge_to_var = {(nodes[v], nodes[w]): i + 1 for i, v, w in
+                            zip(active.tolist(), self.edge_index.u[active].tolist(), self.edge_index.v[active].tolist())}
 
         # other way around
         self.var_to_edge = {v: e for e, v in self.edge_to_var.items()}
@@ -27,39 +55,169 @@ class BTSPSolverSAT:
         """
         Add constraints that assure 1 <= |N(v)| <= d for all v in V.
         """
-        for v in self.graph.nodes:
-            edge_vars = [self.edge_to_var[v, w] for w in self.graph.neighbors(v)]
+        for v in range(self.edge_index.n):
+            edge_vars = self.cut_generator.incident_literals(v)
             # every node has exactly degree 2
-            negative_edge_vars = [-v for v in edge_vars]
-            self.solver.add_atmost(negative_edge_vars, len(edge_vars) - 2)  # at least two edges must be selected
-            self.solver.add_atmost(edge_vars, self.degree)  # at most d can be selected
+            self.__add_atleast(edge_vars, 2)  # at least two edges must be selected
+            self.__add_atmost(edge_vars, self.degree)  # at most d can be selected
 
     def __add_edge_count_constraint(self):
         """
         Add constraint that exactly n edges are selected.
         """
-        positive_edges = [self.edge_to_var[e] for e in self.all_edges]
-        negative_edges = [-v for v in positive_edges]
-        n = len(self.points)
-        self.solver.add_atmost(positive_edges, n)  # at most n edges
-        self.solver.add_atmost(negative_edges, len(self.all_edges) - n)  # at most |E| - n non-edges
+        if not self.solver.supports_atmost() and self.degree == 2:
+            return  # implied by the degree constraints (2n = sum of degrees), and expensive as clauses
+        positive_edges = list(self.var_to_edge)
+        n = self.edge_index.n
+        self.__add_atmost(positive_edges, n)  # at most n edges
+        self.__add_atleast(positive_edges, n)  # at least n edges
+
+    def __add_atmost(self, lits: List[int], bound: int):
+        """
+        Add 'at most bound of lits are true', natively if the backend supports it
+        (Gluecard, Minicard) and as sequential counter clauses otherwise.
+        """
+        if self.solver.supports_atmost():
+            self.solver.add_atmost(lits, bound)
+        else:
+            clauses, self.top_var = atmost_clauses(lits, bound, self.top_var)
+            self.solver.append_formula(clauses)
+
+    def __add_atleast(self, lits: List[int], bound: int):
+        """
+        Add 'at least bound of lits are true', see __add_atmost.
+        """
+        if self.solver.supports_atmost():
+            self.solver.add_atmost([-v for v in lits], len(lits) - bound)
+        else:
+            clauses, self.top_var = atleast_clauses(lits, bound, self.top_var)
+            self.solver.append_formula(clauses)
+
+    def __add_threshold_chain(self):
+        """
+        Order encoding of the threshold. The selector s_i of the active edge at index i
+        means 'the threshold allows edge i'. With x_i -> s_i and s_i -> s_j for the previous
+        active edge j, the single assumption -s_i deactivates edge i and all longer edges.
+        """
+        offset = len(self.all_edges)  # selector variables come after all edge variables
+        previous = None
+        for var in self.var_to_edge:  # ascending, see __make_edge_variables
+            selector = offset + var
+            self.solver.add_clause([-var, selector])
+            if previous is not None:
+                self.solver.add_clause([-selector, previous])
+            previous = selector
+
+    def __build_model(self):
+        """
+        (Re-)build the SAT model on the active edges. Previously found components
+        are added again as lazy constraints, so nothing learned about connectivity is lost.
+        """
+        build_start = time.perf_counter()
+        self.__make_edge_variables()
+        self.cut_generator = CutGenerator(self.edge_index, self.active)
+        self.solver = Solver(self.solver_name, with_proof=False, use_timer=True)
+        self.top_var = 2 * len(self.all_edges)  # edge and selector variables, auxiliary variables come after
+        self.__add_degree_constraints()
+        self.__add_edge_count_constraint()
+        if self.threshold_encoding == "order":
+            self.__add_threshold_chain()
+        for component in self.cuts:
+            self.solver.add_clause(self.__crossing_vars(component))
+        if self.warm_positions is not None:
+            self.__set_phases()
+        self.stats['build_time'] += time.perf_counter() - build_start
+
+    def __set_phases(self):
+        """
+        Let the SAT solver start with the edges of the warm start tour set to true and all others to false.
+        """
+        literals = -(self.active_positions + 1)
+        in_tour = np.isin(self.active_positions, self.warm_positions)
+        literals[in_tour] = -literals[in_tour]
+        self.solver.set_phases(literals.tolist())
+
+    def __grow(self, positions):
+        """
+        Activate the edges at the given positions and rebuild the model.
+        """
+        self.active[positions] = True
+        self.solver.delete()
+        self.__build_model()
 
-    def __init__(self, points: Iterable[Node], degree: int, solver: str = "Gluecard4", solution: List[Edge] = None):
+    def __init__(self, points: Iterable[Node], degree: int, solver: str = "Gluecard4", solution: List[Edge] = None,
+                 candidates: Optional[str] = None, k: int = 8, short_cuts: bool = False,
+                 threshold_encoding: str = "assumptions", cut_store: Optional[CutStore] = None):
         """
         Initialize the solver.
-        :param points: The set of points as (x,y)-tuples.
+        :param points: The set of points as (x,y)-tuples, or an (n, 2) coordinate array.
         :param degree: The maximum degree of a node.
-        :param solution: Optional parameter. Either 'None' or a valid starting solutin (as list of edges).
+        :param solution: Optional parameter. Either 'None' or a valid starting solutin (as list of edges),
+            see warm_start.
+        :param candidates: Optional parameter. Either 'None' (complete graph), 'knn' or 'delaunay'.
+            The model then starts on this sparse edge set and only grows it when needed,
+            the result is still optimal for the complete graph.
+        :param k: The number of nearest neighbours for the candidate set.
+        :param short_cuts: Restrict the connectivity clauses of the binary search to edges
+            below its current upper bound.
+        :param threshold_encoding: Either 'assumptions' (one negative assumption per edge above
+            the threshold) or 'order' (a chain of selector variables added once, so every
+            threshold is a single assumption).
+        :param cut_store: Optional parameter. A CutStore, from which the connectivity clauses of
+            earlier runs on the same points are loaded, and to which the new ones are saved
+            after solve().
         """
-        self.points = set(points)
+        if threshold_encoding not in ("assumptions", "order"):
+            raise ValueError(f"Unknown threshold encoding '{threshold_encoding}'!")
+        self.points = points  # (x,y)-tuples or an (n, 2) coordinate array
         self.degree = degree
-        self.all_edges = all_edges_sorted(points)
-        self.graph = nx.Graph(self.all_edges)
+        edges_start = time.perf_counter()
+        self.edge_index = EdgeIndex(points)
+        edges_time = time.perf_counter() - edges_start
+        self.all_edges = self.edge_index  # sequence of (Node, Node) tuples, backed by the index arrays
         self.best_solution = solution
-        self.solver = Solver(solver, with_proof=False, use_timer=True)
-        self.__make_edge_variables()
-        self.__add_degree_constraints()
-        self.__add_edge_count_constraint()
+        self.warm_positions: Optional[np.ndarray] = None  # edge positions of the warm start tour
+        self.solver_name = solver
+        self.threshold_encoding = threshold_encoding
+        self.k = k
+        if candidates is None:
+            self.active = np.ones(len(self.all_edges), dtype=bool)
+        else:
+            self.active = candidate_mask(self.edge_index, candidates, k)
+        if solution is not None:
+            # the starting solution has to stay representable in the model
+            self.warm_positions = solution_positions(self.edge_index, solution)
+            self.active[self.warm_positions] = True
+        self.cuts: List[np.ndarray] = []  # vertex indices of all components that were cut off
+        self.short_cuts = short_cuts
+        self.cut_limit: Optional[int] = None  # the largest edge index used in connectivity clauses
+        # Time spent inside the SAT solver and in the Python code of the lazy constraint
+        # loop, in total and per iteration as (threshold, sat seconds, python seconds).
+        # The *_time entries of the other phases are in seconds, too (the extraction of
+        # solutions is part of python_time).
+        self.stats = {'sat_calls': 0, 'sat_time': 0.0, 'python_time': 0.0, 'cut_rounds': 0,
+                      'edges_time': edges_time, 'build_time': 0.0, 'bounds_time': 0.0, 'extract_time': 0.0}
+        self.iterations: List[Tuple[int, float, float]] = []
+        # Optional callable (lb, ub) -> (lb, ub), called by the searches after every probe.
+        # It can tighten the bounds with results from elsewhere, e.g. other portfolio workers.
+        self.bound_exchange: Optional[Callable[[int, int], Tuple[int, int]]] = None
+        # Optional callable (bottleneck, solution), called for every improving solution.
+        self.on_improvement: Optional[Callable[[float, List[Edge]], None]] = None
+        # The bounds of the last search: the largest edge index known to be infeasible
+        # and the bottleneck index of the best solution.
+        self.lb_index, self.ub_index = -1, len(self.all_edges) - 1
+        self.timed_out = False
+        self.interrupted = False
+        self.interruptible = True  # False for backends without limited solving (CaDiCaL)
+        self.__build_model()
+        bounds_start = time.perf_counter()
+        # No threshold below this index has a 2-connected threshold graph, so no tour can exist there.
+        self.connectivity = ThresholdConnectivity(self.edge_index)
+        self.lower_bound = lower_bound_index(self.connectivity, tour=True)
+        self.stats['bounds_time'] = time.perf_counter() - bounds_start
+        self.cut_store = cut_store
+        if cut_store is not None:
+            self.add_cuts(cut_store.load(self.edge_index))
 
     def __del__(self):
         """
@@ -70,26 +228,100 @@ class BTSPSolverSAT:
         """
         self.solver.delete()
 
+    def warm_start(self, solution: List[Edge]):
+        """
+        Start from a tour, e.g. from heuristic.heuristic_tour or an earlier run: it becomes
+        the upper bound of the searches if it is better than the best solution so far,
+        and the SAT solver starts with its edges set to true (phases).
+        """
+        positions = solution_positions(self.edge_index, solution)
+        if self.best_solution is None or int(positions.max()) < self.__max_index(self.best_solution):
+            self.best_solution = solution
+        self.warm_positions = positions
+        missing = positions[~self.active[positions]]
+        if len(missing):
+            self.__grow(missing)  # the rebuild sets the phases
+        else:
+            self.__set_phases()
+
+    def interrupt(self):
+        """
+        Stop the search from another thread. A running SAT call returns early if the
+        backend supports it, otherwise the search stops after it. The search then
+        raises SearchInterrupted.
+        """
+        self.interrupted = True
+        if self.interruptible:
+            try:
+                self.solver.interrupt()
+            except NotImplementedError:
+                self.interruptible = False
+
+    def __sat_call(self, assumptions: List[int]) -> bool:
+        if self.interrupted:
+            raise SearchInterrupted()
+        if self.interruptible:
+            try:
+                feasible = self.solver.solve_limited(assumptions=assumptions, expect_interrupt=True)
+            except NotImplementedError:
+                self.interruptible = False
+                feasible = self.solver.solve(assumptions=assumptions)
+        else:
+            feasible = self.solver.solve(assumptions=assumptions)
+        if feasible is None or self.interrupted:
+            raise SearchInterrupted()
+        return feasible
+
     def __threshold_assumptions(self, threshold: int):
         """
         Create list of assumptions, which deactivate all edges longer than the
         edge at a given threshold index.
         """
-        return [-self.edge_to_var[e] for e in self.all_edges[threshold + 1:]]
+        if self.threshold_encoding == "order":
+            # deactivate the first active edge above the threshold, the chain does the rest
+            i = np.searchsorted(self.active_positions, threshold + 1)
+            if i == len(self.active_positions):
+                return []
+            return [-(len(self.all_edges) + int(self.active_positions[i]) + 1)]
+        # The variable of the edge at index i is i+1 (see __make_edge_variables)
+        return [-v for v in self.var_to_edge if v > threshold + 1]
 
-    def __handle_components(self, components):
+    def __crossing_vars(self, component: np.ndarray):
+        """
+        Return the variables of all active edges leaving the component (given as vertex indices).
+        With short cuts, edges above the upper bound of the search are left out, as they
+        can never be selected again.
+        """
+        literals = self.cut_generator.crossing_literals(component, self.cut_limit)
+        if not literals and self.cut_limit is not None:
+            literals = self.cut_generator.crossing_literals(component)
+        return literals
+
+    def __handle_components(self, components) -> bool:
         """
         Add 'lazy constraints' for solutions which feature more than one connected component.
         This forces the solver to select at least one edge that leaves the component
         for every component in the graph.
+        If no active edge leaves a component, the shortest edges leaving it are activated
+        and the model is rebuilt, in which case True is returned.
         """
+        isolated = []
         for component in components:
-            crossing_edges = []
-            vset = set(component)
-            for v in component:
-                for w in self.points - vset:
-                    crossing_edges.append(self.edge_to_var[v, w])
-            self.solver.add_clause(crossing_edges)
+            self.cuts.append(component)
+            crossing_edges = self.__crossing_vars(component)
+            if crossing_edges:
+                self.solver.add_clause(crossing_edges)
+            else:
+                isolated.append(component)
+        if not isolated:
+            return False
+        positions = []
+        for component in isolated:
+            in_component = np.zeros(self.edge_index.n, dtype=bool)
+            in_component[component] = True
+            positions.append(shortest_crossing_edges(self.edge_index, in_component, self.k))
+        self.__grow(np.concatenate(positions))  # a single rebuild, e.g. for many loaded cuts
+        return True
 
     def __solve_with_threshold(self, threshold: int) -> Optional[int]:
         """
@@ -105,92 +337,223 @@ class BTSPSolverSAT:
         # edges longer than the given threshold index edge.
         assumptions = self.__threshold_assumptions(threshold)
         while True:
-            if not self.solver.solve(assumptions=assumptions):
-                print(f"The bottleneck {math.dist(*self.all_edges[threshold])} is infeasible!")
-                return None
-            edges = self.__model_to_solution()
-            # draw_edges(edges)
-            # plt.show()
-            edge_set = set(edges)
-            g = self.graph.edge_subgraph(edges)
-            components = list(nx.connected_components(g))
+            sat_start = time.perf_counter()
+            feasible = self.__sat_call(assumptions)
+            sat_time = time.perf_counter() - sat_start
+            self.stats['sat_calls'] += 1
+            self.stats['sat_time'] += sat_time
+            if not feasible:
+                self.iterations.append((threshold, sat_time, 0.0))
+                if self.active[:threshold + 1].all():
+                    print(f"The bottleneck {math.dist(*self.all_edges[threshold])} is infeasible!")
+                    return None
+                # Only infeasible on the candidate edges, which does not prove anything for
+                # the complete graph. Double the neighbourhood size below the threshold and retry.
+                missing = np.zeros(threshold + 1, dtype=bool)
+                while not missing.any():
+                    self.k *= 2
+                    missing = knn_mask(self.edge_index, self.k)[:threshold + 1] & ~self.active[:threshold + 1]
+                self.__grow(np.flatnonzero(missing))
+                assumptions = self.__threshold_assumptions(threshold)
+                continue
+            python_start = time.perf_counter()
+            # Work on the literals directly: no edge tuples or networkx graphs per iteration
+            selected = selected_positions(self.solver.get_model(), self.active)
+            components = components_of(self.edge_index.n, self.edge_index.u[selected], self.edge_index.v[selected])
             if len(components) > 1:
-                self.__handle_components(components)
+                self.stats['cut_rounds'] += 1
+                if self.__handle_components(components):
+                    assumptions = self.__threshold_assumptions(threshold)
+                self.__record_python_time(threshold, sat_time, python_start)
             else:
-                threshold = self.__max_index(edges)
+                extract_start = time.perf_counter()
+                self.best_solution = self.__model_to_solution(selected)
+                self.stats['extract_time'] += time.perf_counter() - extract_start
+                self.__record_python_time(threshold, sat_time, python_start)
+                threshold = int(selected.max())
                 print(f"New best bottleneck: {math.dist(*self.all_edges[threshold])}!")
-                self.best_solution = edges
+                if self.on_improvement is not None:
+                    self.on_improvement(math.dist(*self.all_edges[threshold]), self.best_solution)
                 return threshold
 
-    def __model_to_solution(self) -> List[Edge]:
+    def __record_python_time(self, threshold: int, sat_time: float, python_start: float):
+        python_time = time.perf_counter() - python_start
+        self.stats['python_time'] += python_time
+        self.iterations.append((threshold, sat_time, python_time))
+
+    def __model_to_solution(self, selected: np.ndarray) -> List[Edge]:
         """
-        Turn a valid SAT-assignment (solution) to a list of edges.
+        Turn the selected edge positions of a valid SAT-assignment (solution) to a list of edges.
         """
-        model = self.solver.get_model()
-        return [self.var_to_edge[lit] for lit in model if lit > 0]
+        nodes = self.edge_index.nodes
+        return [(nodes[v], nodes[w]) for v, w in
+                zip(self.edge_index.u[selected].tolist(), self.edge_index.v[selected].tolist())]
 
     def __index_of_solution_with_threshold(self, threshold: int) -> Optional[int]:
         """
         Return the index of the longest used edge in the solution.
         If the solution is invalid (graph unconnected), 'None' is returned.
         """
-        g = self.graph.edge_subgraph(self.all_edges[:threshold + 1])
-        if not nx.is_connected(g):
+        if not self.connectivity.is_connected(threshold):
             print(f"The bottleneck {math.dist(*self.all_edges[threshold])} created an unconnected graph!")
             return None
         return self.__solve_with_threshold(threshold)
 
+    def probe(self, threshold: int, ub: Optional[int] = None) -> Optional[int]:
+        """
+        Decide a single threshold for a search that is driven from outside, e.g. by several
+        solver instances in parallel. ub is the best bottleneck index known to the caller,
+        which limits the connectivity clauses if short cuts are used.
+        Return the index of the longest edge of the found solution, or 'None'.
+        """
+        if self.short_cuts and ub is not None:
+            self.cut_limit = ub
+        return self.__index_of_solution_with_threshold(threshold)
+
+    def add_cuts(self, components: List[np.ndarray]):
+        """
+        Add the connectivity clauses of components (as vertex indices) that another solver
+        instance found for the same points. They hold for every threshold.
+        """
+        if components:
+            self.__handle_components(components)
+
     def __max_index(self, solution: List[Edge]):
         """
         Return the index of the longest edge in a given solution.
         """
         return max((self.edge_to_var[e] - 1 for e in solution))
 
-    def linear_search_ascending(self):
+    def __initial_bounds(self) -> Tuple[int, int]:
         """
-        Linear search for the shortest bottleneck edge under degree constraint self.degree in ascending order
+        Return the largest index known to be infeasible and the smallest known valid bottleneck.
         """
-        start = 0  # Starting edge index
+        lb = self.lower_bound - 1
+        ub = len(self.all_edges) - 1
         if self.best_solution is not None:
-            start = self.__max_index(self.best_solution)
-        for index, edge in enumerate(self.all_edges[start:]):
-            self.__index_of_solution_with_threshold(index)
+            ub = self.__max_index(self.best_solution)
+        return self.__exchange_bounds(lb, ub)
+
+    def __exchange_bounds(self, lb: int, ub: int) -> Tuple[int, int]:
+        if self.bound_exchange is not None:
+            lb, ub = self.bound_exchange(lb, ub)
+        if self.short_cuts:
+            self.cut_limit = ub  # no later probe allows an edge above ub
+        self.lb_index, self.ub_index = lb, ub
+        return lb, ub
+
+    def __finish(self, lb: int, ub: int):
+        if self.best_solution is None and ub == len(self.all_edges) - 1:
+            # The bounds met before any probe, the upper bound itself is optimal.
+            self.__index_of_solution_with_threshold(ub)
+            self.__exchange_bounds(lb, ub)
+
+    def linear_search_ascending(self):
+        """
+        Linear search for the shortest bottleneck edge under degree constraint self.degree in ascending order.
+        The first feasible threshold is optimal.
+        """
+        lb, ub = self.__initial_bounds()
+        while lb < ub - 1:
+            actual_index = self.__index_of_solution_with_threshold(lb + 1)
+            if actual_index is not None:
+                ub = actual_index
+            else:
+                lb += 1
+            lb, ub = self.__exchange_bounds(lb, ub)
+        self.__finish(lb, ub)
 
     def linear_search_descending(self):
         """
-        Linear search for the shortest bottleneck edge under degree constraint self.degree in descending order
+        Linear search for the shortest bottleneck edge under degree constraint self.degree in descending order.
+        Every solution moves the threshold below its bottleneck, the first infeasible threshold ends the search.
         """
-        start = 0  # Starting edge index
-        if self.best_solution is not None:
-            start = self.__max_index(self.best_solution)
-        for index, edge in enumerate(reversed(self.all_edges[start:])):
-            self.__index_of_solution_with_threshold(index)
+        lb, ub = self.__initial_bounds()
+        while lb < ub - 1:
+            actual_index = self.__index_of_solution_with_threshold(ub - 1)
+            if actual_index is not None:
+                ub = actual_index
+            else:
+                lb = ub - 1
+            lb, ub = self.__exchange_bounds(lb, ub)
+        self.__finish(lb, ub)
 
     def binary_search(self):
         """
         Binary search for the shortest bottleneck edge under degree constraint self.degree
         """
-        lb = len(self.points) - 2  # The largest index that we know of to be essential
-        ub = len(self.all_edges) - 1  # The smallest valid bottleneck we found
-        if self.best_solution is not None:
-            ub = self.__max_index(self.best_solution)
+        lb, ub = self.__initial_bounds()  # The largest index that we know of to be infeasible, the smallest valid bottleneck
         while lb < ub - 1:
             mid = (lb + ub) // 2  # Integer division in Python: //
             actual_index = self.__index_of_solution_with_threshold(mid)
-            if actual_index:
+            if actual_index is not None:
                 ub = actual_index
             else:
                 lb = mid
+            lb, ub = self.__exchange_bounds(lb, ub)
+        self.__finish(lb, ub)
 
-    def solve(self, method: int):
-        if method == 0:
-            self.binary_search()
-        elif method == 1:
-            self.linear_search_descending()
-        elif method == 2:
-            self.linear_search_ascending()
-        else:
+    def save_cuts(self):
+        """
+        Save the connectivity clauses found so far to the cut store, if there is one.
+        """
+        if self.cut_store is not None:
+            self.cut_store.save(self.edge_index, self.cuts)
+
+    def __time_out(self):
+        self.timed_out = True
+        self.interrupt()
+
+    def solve(self, method: int, time_limit: Optional[float] = None,
+              on_improvement: Optional[Callable[[float, List[Edge]], None]] = None):
+        """
+        :param method: 0 binary search, 1 linear search descending, 2 linear search ascending.
+        :param time_limit: Optional time budget in seconds. The search is then interrupted
+            (inside the SAT call if the backend supports it) and the best solution so far is
+            returned, see result() for its lower bound and gap.
+        :param on_improvement: Optional callable (bottleneck, solution), called for every improving solution.
+        """
+        if method not in (0, 1, 2):
             print("method invalid")
             return None
+        if on_improvement is not None:
+            self.on_improvement = on_improvement
+        timer = None
+        if time_limit is not None:
+            timer = threading.Timer(time_limit, self.__time_out)
+            timer.daemon = True
+            timer.start()
+        try:
+            if method == 0:
+                self.binary_search()
+            elif method == 1:
+                self.linear_search_descending()
+            else:
+                self.linear_search_ascending()
+        except SearchInterrupted:
+            if not self.timed_out:
+                raise
+            print(f"Time limit of {time_limit}s reached!")
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if self.timed_out:
+                # the interrupt came from the own timer, the solver can be used again
+                self.timed_out = self.interrupted = False
+                if self.interruptible:
+                    self.solver.clear_interrupt()
+            self.save_cuts()  # also after an interrupt or timeout
+
+        return self.best_solution, self.stats['sat_time']
 
-        return self.best_solution, self.solver.time_accum()
+    def result(self) -> SearchResult:
+        """
+        The best solution with its proven lower bound, also after a timeout.
+        """
+        lower_bound = math.dist(*self.all_edges[self.lb_index + 1])
+        if self.best_solution is None:
+            return SearchResult(None, None, lower_bound, None, False)
+        bottleneck = max(math.dist(*e) for e in self.best_solution)
+        optimal = self.lb_index >= self.ub_index - 1
+        gap = 0.0 if optimal or bottleneck == 0 else (bottleneck - lower_bound) / bottleneck
+        return SearchResult(self.best_solution, bottleneck, lower_bound, gap, optimal)
@@ -1,7 +1,15 @@
 from typing import List, Set, Tuple, Iterable, Optional
 import matplotlib.pyplot as plt
 import networkx as nx
-import itertools
+import os
+import sys
+
+# The modules shared by all sheets live in the package 'alglab' at the repository root.
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from alglab.util import EdgeIndex
 
 Node = Tuple[int, int]
 Edge = Tuple[Node, Node]
@@ -17,9 +25,7 @@ def all_edges_sorted(points: Iterable[Node]) -> List[Node]:
     Create a list containing all edges between each two points of the given
     point set/list and returns them in sorted, ascending order. 
     """
-    edges = [(v,w) for v, w in itertools.combinations(points, 2)]
-    edges.sort(key=lambda e: squared_distance(*e))  # *e is like e[0], e[1]
-    return edges
+    return EdgeIndex(points).as_tuples()
 
 def draw_edges(edges):
     """
@@ -36,4 +42,4 @@ def draw_edges(edges):
     fig.set_size_inches(8,6)
     nx.draw_networkx(draw_graph, pos={p: p for p in draw_graph.nodes}, node_size=8,
                      with_labels=False, edgelist=g_edges, edge_color=color, width=width, ax=ax)
-    plt.show()
\ No newline at end of file
+    plt.show()
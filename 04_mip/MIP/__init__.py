@@ -2,8 +2,16 @@ from .util import Node, Edge, Set, draw_edges, squared_distance, suppress_stdout
 
 from .greedy import Greedy_Btsp
 
+from alglab.heuristic import heuristic_tour
+
+from alglab.warm_start import warm_start_tour, SolutionCache
+
 from .solver import BTSPSolverIP
 
+from .backend import available_backends
+
 from .cp_solver import BTSPSolverCP
 
-from .benchmark import benchmark_average_time, benchmark_time_limit
+from alglab.result_store import ResultStore
+
+from .benchmark import benchmark_average_time, benchmark_time_limit, benchmark_backends
@@ -0,0 +1,367 @@
+"""
+MIP backends for BTSPSolverIP, so that the model also runs without a (full)
+Gurobi license. A backend holds a MIP as columns and blocks of sparse rows
+over the column indices, and solves it with the rows returned by separators:
+Gurobi adds them in its callback, as lazy constraints for integral solutions
+(MIPSOL) and as user cuts for the fractional node solutions (MIPNODE). The
+open solvers (SCIP, HiGHS and CBC through the linear solver wrapper of
+OR-Tools) have no such callbacks there, so the fractional separator is run
+on the LP relaxation at the root, and the model is then solved again and
+again in a cutting-plane loop, with the rows violated by the last integral
+solution added to the model.
+gurobipy and ortools are both optional, only the backends that can be
+imported are available (see BACKENDS and available_backends).
+"""
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+try:
+    import gurobipy as grb
+except ImportError:
+    grb = None
+
+try:
+    from ortools.linear_solver import pywraplp
+except ImportError:
+    pywraplp = None
+
+# status of Backend.optimize
+OPTIMAL, INFEASIBLE, TIME_LIMIT = "optimal", "infeasible", "time_limit"
+# How much a row of a separator must be violated, and the objective of a cut round improve.
+TOLERANCE = 1e-6
+
+# A block of rows lower <= matrix @ columns <= upper, unbounded sides are +-np.inf.
+# The matrix can have fewer columns than the model, the missing ones have coefficient 0.
+Rows = Tuple[csr_matrix, np.ndarray, np.ndarray]
+# Gets the values of all columns of a solution and returns the rows it violates, or None.
+Separator = Callable[[np.ndarray], Optional[Rows]]
+
+
+def _senses(matrix: csr_matrix, lower: np.ndarray, upper: np.ndarray):
+    """
+    Split a block of rows into (rows, sense, right hand side) with the senses '=', '>' and '<'.
+    A row with two different finite bounds is in both the '>' and the '<' part.
+    """
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    equal = lower == upper
+    for mask, sense, rhs in ((equal, '=', lower), (~equal & np.isfinite(lower), '>', lower),
+                             (~equal & np.isfinite(upper), '<', upper)):
+        if mask.any():
+            yield matrix[mask], sense, rhs[mask]
+
+
+class Backend(ABC):
+    """
+    A MIP that is built column block by column block and row block by row block.
+    """
+    name = None
+    # True if the rows of the separators stay in the model after optimize (cutting-plane
+    # loop), False if they are only used during the optimize call (Gurobi callbacks).
+    keeps_cuts = False
+
+    def __init__(self):
+        self.rounds = 0  # solves of the cutting-plane loop, or solutions checked in the callback
+        self.runtime = 0.0  # seconds spent in the last optimize call
+
+    @abstractmethod
+    def add_columns(self, lower: Sequence[float], upper: Sequence[float], cost: Sequence[float],
+                    integer: bool) -> int:
+        """
+        Add columns and return the index of the first one.
+        """
+
+    @abstractmethod
+    def add_rows(self, matrix: csr_matrix, lower: np.ndarray, upper: np.ndarray):
+        """
+        Add the rows lower <= matrix @ columns <= upper.
+        """
+
+    @abstractmethod
+    def set_bounds(self, first: int, lower: Sequence[float], upper: Sequence[float]):
+        """
+        Change the bounds of the columns first, first + 1, ...
+        """
+
+    @abstractmethod
+    def set_objective(self, cost: Sequence[float]):
+        """
+        Change the (minimized) objective, one coefficient per column.
+        """
+
+    @abstractmethod
+    def set_start(self, values: Sequence[float]):
+        """
+        A (feasible) solution over all columns to start from.
+        """
+
+    @abstractmethod
+    def optimize(self, separate: Separator, separate_fractional: Optional[Separator] = None,
+                 time_limit: Optional[float] = None) -> str:
+        """
+        Solve the MIP with the rows returned by separate for integral solutions (which must
+        cut off every infeasible one) and by separate_fractional for fractional solutions.
+        Return the status.
+        """
+
+    @abstractmethod
+    def values(self) -> np.ndarray:
+        """
+        Values of all columns in the last solution.
+        """
+
+    @abstractmethod
+    def objective_value(self) -> float:
+        pass
+
+
+class GurobiBackend(Backend):
+    name = "gurobi"
+
+    def __init__(self):
+        if grb is None:
+            raise ImportError("The gurobi backend needs gurobipy.")
+        super().__init__()
+        self.model = grb.Model()
+        self.model.Params.LogToConsole = 0
+        self.model.Params.lazyConstraints = 1
+        # User cuts (cbCut) need a presolve that keeps the original variables
+        self.model.Params.preCrush = 1
+        self.vars = []
+        self.columns = None  # all columns as one MVar
+
+    def add_columns(self, lower, upper, cost, integer):
+        first = len(self.vars)
+        vtype = grb.GRB.INTEGER if integer else grb.GRB.CONTINUOUS
+        self.vars += self.model.addMVar(len(cost), lb=lower, ub=upper, obj=cost, vtype=vtype).tolist()
+        self.columns = grb.MVar.fromlist(self.vars)
+        return first
+
+    def __block(self, matrix: csr_matrix) -> csr_matrix:
+        # pad the matrix to all columns
+        matrix = csr_matrix(matrix)
+        return csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], len(self.vars)))
+
+    def add_rows(self, matrix, lower, upper):
+        for rows, sense, rhs in _senses(self.__block(matrix), lower, upper):
+            self.model.addMConstr(rows, self.columns, sense, rhs)
+        self.model.update()
+
+    def __add_callback_rows(self, add, rows: Optional[Rows]):
+        if rows is None:
+            return
+        for block, sense, rhs in _senses(self.__block(rows[0]), rows[1], rows[2]):
+            expression = block @ self.columns
+            add(expression == rhs if sense == '=' else expression >= rhs if sense == '>' else expression <= rhs)
+
+    def set_bounds(self, first, lower, upper):
+        columns = self.columns[first:first + len(upper)]
+        columns.LB = np.asarray(lower, dtype=float)
+        columns.UB = np.asarray(upper, dtype=float)
+
+    def set_objective(self, cost):
+        self.columns.Obj = np.asarray(cost, dtype=float)
+
+    def set_start(self, values):
+        self.columns.Start = np.asarray(values, dtype=float)
+
+    def values(self):
+        return self.columns.X
+
+    def objective_value(self):
+        return self.model.objVal
+
+    def optimize(self, separate, separate_fractional=None, time_limit=None):
+        def callback(model, where):
+            if where == grb.GRB.Callback.MIPSOL:
+                # an integral solution, cut it off if it is infeasible
+                self.rounds += 1
+                self.__add_callback_rows(model.cbLazy, separate(np.asarray(model.cbGetSolution(self.columns))))
+            elif separate_fractional is not None and where == grb.GRB.Callback.MIPNODE and \
+                    model.cbGet(grb.GRB.Callback.MIPNODE_STATUS) == grb.GRB.OPTIMAL:
+                # the fractional solution of the node relaxation
+                self.__add_callback_rows(model.cbCut,
+                                         separate_fractional(np.asarray(model.cbGetNodeRel(self.columns))))
+
+        self.model.Params.TimeLimit = grb.GRB.INFINITY if time_limit is None else max(time_limit, 0)
+        self.model.optimize(callback)
+        self.runtime = self.model.Runtime
+        if self.model.status == grb.GRB.TIME_LIMIT:
+            return TIME_LIMIT
+        if self.model.status in (grb.GRB.INFEASIBLE, grb.GRB.INF_OR_UNBD):
+            return INFEASIBLE
+        if self.model.status != grb.GRB.OPTIMAL:
+            raise RuntimeError(f"Unexpected status: {self.model.status} after optimization!")
+        return OPTIMAL
+
+
+class OrToolsBackend(Backend):
+    """
+    The open MIP solvers behind the linear solver wrapper of OR-Tools (SCIP, HiGHS, CBC).
+    The wrapper has no callbacks and builds every row and column from single coefficients,
+    so optimize runs cut rounds on the LP relaxation and then the cutting-plane loop.
+    """
+    keeps_cuts = True
+
+    def __init__(self, solver_id: str):
+        if pywraplp is None:
+            raise ImportError(f"The {solver_id} backend needs ortools.")
+        super().__init__()
+        self.name = solver_id.lower()
+        self.solver = pywraplp.Solver.CreateSolver(solver_id)
+        if self.solver is None:
+            raise ImportError(f"OR-Tools is built without {solver_id}.")
+        self.solver.SuppressOutput()
+        if self.name == "highs":
+            # SuppressOutput does not stop the banner that HiGHS prints on every solve
+            self.solver.SetSolverSpecificParametersAsString("output_flag=false\nlog_to_console=false")
+        self.solver.Objective().SetMinimization()
+        self.vars = []
+        self.integer = []  # the integer columns
+        self.cut_keys = set()  # the rows of the separators in the model
+
+    def add_columns(self, lower, upper, cost, integer):
+        first = len(self.vars)
+        objective = self.solver.Objective()
+        for lb, ub, c in zip(np.asarray(lower, dtype=float).tolist(), np.asarray(upper, dtype=float).tolist(),
+                             np.asarray(cost, dtype=float).tolist()):
+            x = self.solver.IntVar(lb, ub, '') if integer else self.solver.NumVar(lb, ub, '')
+            objective.SetCoefficient(x, c)
+            self.vars.append(x)
+        if integer:
+            self.integer += self.vars[first:]
+        return first
+
+    def add_rows(self, matrix, lower, upper):
+        matrix = csr_matrix(matrix)
+        infinity = self.solver.infinity()
+        indptr, indices, data = matrix.indptr.tolist(), matrix.indices.tolist(), matrix.data.tolist()
+        for i, (lb, ub) in enumerate(zip(np.asarray(lower, dtype=float).tolist(),
+                                         np.asarray(upper, dtype=float).tolist())):
+            constraint = self.solver.RowConstraint(max(lb, -infinity), min(ub, infinity), '')
+            for j, coefficient in zip(indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]]):
+                constraint.SetCoefficient(self.vars[j], coefficient)
+
+    def set_bounds(self, first, lower, upper):
+        for x, lb, ub in zip(self.vars[first:], np.asarray(lower, dtype=float).tolist(),
+                             np.asarray(upper, dtype=float).tolist()):
+            x.SetBounds(lb, ub)
+
+    def set_objective(self, cost):
+        objective = self.solver.Objective()
+        for x, c in zip(self.vars, np.asarray(cost, dtype=float).tolist()):
+            objective.SetCoefficient(x, c)
+        objective.SetMinimization()
+
+    def set_start(self, values):
+        if self.name == "highs":
+            return  # the HiGHS interface of OR-Tools crashes on a solve with a hint
+        self.solver.SetHint(self.vars, np.asarray(values, dtype=float).tolist())
+
+    def __solve_once(self, deadline: Optional[float]) -> str:
+        if deadline is not None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return TIME_LIMIT
+            self.solver.SetTimeLimit(max(int(remaining * 1000), 1))
+        self.rounds += 1
+        status = self.solver.Solve()
+        if status == pywraplp.Solver.OPTIMAL:
+            return OPTIMAL
+        if status == pywraplp.Solver.INFEASIBLE:
+            return INFEASIBLE
+        if status in (pywraplp.Solver.FEASIBLE, pywraplp.Solver.NOT_SOLVED) and deadline is not None:
+            return TIME_LIMIT  # stopped by the time limit before optimality was proven
+        raise RuntimeError(f"Unexpected status: {status} after optimization!")
+
+    def __add_cuts(self, rows: Optional[Rows], values: np.ndarray) -> int:
+        """
+        Add the rows of a separator that are not in the model yet and violated by values.
+        Return the number of added rows.
+        """
+        if rows is None or rows[0].shape[0] == 0:
+            return 0
+        matrix = csr_matrix(rows[0])
+        matrix.sort_indices()
+        lower, upper = np.asarray(rows[1], dtype=float), np.asarray(rows[2], dtype=float)
+        activity = matrix @ values[:matrix.shape[1]]
+        keep = []
+        for i in np.flatnonzero((activity < lower - TOLERANCE) | (activity > upper + TOLERANCE)).tolist():
+            start, end = matrix.indptr[i], matrix.indptr[i + 1]
+            key = (matrix.indices[start:end].tobytes(), matrix.data[start:end].tobytes(), lower[i], upper[i])
+            if key not in self.cut_keys:
+                self.cut_keys.add(key)
+                keep.append(i)
+        if keep:
+            self.add_rows(matrix[keep], lower[keep], upper[keep])
+        return len(keep)
+
+    def __separate_relaxation(self, separate_fractional: Separator, deadline: Optional[float]) -> str:
+        """
+        Cut rounds at the root: solve the LP relaxation and add the rows violated by its
+        solution, until there are no new ones or the objective stops improving.
+        The integrality is restored afterwards.
+        """
+        for x in self.integer:
+            x.SetInteger(False)
+        try:
+            objective = -np.inf
+            while True:
+                status = self.__solve_once(deadline)
+                if status != OPTIMAL:
+                    return status
+                if self.objective_value() <= objective + TOLERANCE:
+                    return OPTIMAL
+                objective = self.objective_value()
+                values = self.values()
+                if not self.__add_cuts(separate_fractional(values), values):
+                    return OPTIMAL
+        finally:
+            for x in self.integer:
+                x.SetInteger(True)
+
+    def optimize(self, separate, separate_fractional=None, time_limit=None):
+        start = time.perf_counter()
+        deadline = None if time_limit is None else start + time_limit
+        try:
+            if separate_fractional is not None:
+                status = self.__separate_relaxation(separate_fractional, deadline)
+                if status != OPTIMAL:
+                    return status
+            while True:
+                status = self.__solve_once(deadline)
+                if status != OPTIMAL:
+                    return status
+                values = self.values()
+                rows = separate(values)
+                if rows is None or rows[0].shape[0] == 0:
+                    return OPTIMAL
+                if not self.__add_cuts(rows, values):
+                    raise RuntimeError("The separator cut off a solution without a new violated row!")
+        finally:
+            self.runtime = time.perf_counter() - start
+
+    def values(self):
+        return np.array([x.solution_value() for x in self.vars])
+
+    def objective_value(self):
+        return self.solver.Objective().Value()
+
+
+BACKENDS: Dict[str, Callable[[], Backend]] = {
+    "gurobi": GurobiBackend,
+    "scip": lambda: OrToolsBackend("SCIP"),
+    "highs": lambda: OrToolsBackend("HIGHS"),
+    "cbc": lambda: OrToolsBackend("CBC"),
+}
+
+
+def available_backends() -> List[str]:
+    """
+    Names of the backends whose solver package is installed.
+    """
+    return ((["gurobi"] if grb is not None else [])
+            + ([name for name in BACKENDS if name != "gurobi"] if pywraplp is not None else []))
@@ -1,46 +1,148 @@
 from MIP import *
+import math
 import statistics
 import random
+import time
 
+from alglab.instance_set import InstanceSet
 
-def benchmark_average_time(num_points, iterations, use_greedy=False):
+
+def instance_points(num_points, i, seed=None):
+    """
+    Random instance, which is the same in every run if a seed is given.
+    This is needed to resume a benchmark from a result store.
+    """
+    if seed is not None:
+        random.seed(f'{seed}/{num_points}/{i}')
+    return util.random_points(num_points)
+
+
+def bottleneck_of(edges):
+    return max(math.dist(*e) for e in edges)
+
+
+def benchmark_average_time(num_points, iterations, use_greedy=False, store=None, seed=None):
+    """
+    :param store: Optional ResultStore. Finished runs are taken from it instead of solving
+        them again, new runs are recorded. The instances are then seeded (seed 0 by default).
+    """
+    if store is not None and seed is None:
+        seed = 0
+    params = {'use_greedy': use_greedy}
     times = list()
+    build_times = list()  # model building, not part of the solver time
     for i in range(iterations):
-        points = util.random_points(num_points)
-        edges = util.all_edges_sorted(points)
+        points = instance_points(num_points, i, seed)
+        if store is not None:
+            instance = util.instance_hash(points)
+            result = store.result(instance, 'BTSPSolverIP', params)
+            if result is not None:
+                times.append(result['solver_time'])
+                continue
+        start_time = time.time()
+        edges = util.EdgeIndex(points)
         solver = BTSPSolverIP(points, edges)
-        solver.model_bottleneck.setParam('LogToConsole', 0)
         if use_greedy:
-            start, bottleneck = Greedy_Btsp(points).solve()
+            start, bottleneck = Greedy_Btsp(points).solve(edges)
             sol, time_taken = solver.solve(start, bottleneck)
         else:
             sol, time_taken = solver.solve()
         times.append(time_taken)
+        build_times.append(solver.stats['build_time'])
+        if store is not None:
+            store.record(instance, 'BTSPSolverIP', params, bottleneck_of(sol), time.time() - start_time,
+                         time_taken, 'optimal')
     average_time = statistics.mean(times)
     print(f'Average time: {average_time}')
+    if build_times:
+        print(f'Average model build time: {statistics.mean(build_times)}')
 
 
-def benchmark_time_limit(time_limit, start_points, step):
+def benchmark_time_limit(time_limit, start_points, step, store=None, seed=None):
+    """
+    :param store: Optional ResultStore, see benchmark_average_time.
+    """
+    if store is not None and seed is None:
+        seed = 0
+    params = {'time_limit': time_limit}
     num_points = start_points
     last_solvable_instance = []
     time_taken = 0
 
     while True:
         print(f'Number of points: {num_points}')
-        points = util.random_points(num_points)
-        edges = util.all_edges_sorted(points)
+        points = instance_points(num_points, 0, seed)
+        if store is not None:
+            instance = util.instance_hash(points)
+            result = store.result(instance, 'BTSPSolverIP', params)
+            if result is not None:
+                print(f'Stored result for {num_points} points: {result["status"]}, {result["solver_time"]}')
+                if result['status'] == 'timeout':
+                    break
+                time_taken = result['solver_time']
+                num_points += step
+                continue
+        start_time = time.time()
+        edges = util.EdgeIndex(points)
         solver = BTSPSolverIP(points, edges)
-        solver.model_bottleneck.setParam('TimeLimit', time_limit)
-        solver.model_bottleneck.setParam('LogToConsole', 0)
         try:
-            last_solvable_instance, time_taken = solver.solve()
-            print(f'Time taken for {num_points} points: {time_taken}')
+            last_solvable_instance, time_taken = solver.solve(time_limit=time_limit)
+            print(f'Time taken for {num_points} points: {time_taken} (model build: {solver.stats["build_time"]})')
+            if store is not None:
+                store.record(instance, 'BTSPSolverIP', params, bottleneck_of(last_solvable_instance),
+                             time.time() - start_time, time_taken, 'optimal')
         except TimeoutError as e:
             print(e)
+            if store is not None:
+                store.record(instance, 'BTSPSolverIP', params, None, time.time() - start_time, time_limit, 'timeout')
             break
 
         num_points += step
 
     print(f'Last solvable instance has {num_points - step} points, time taken: {time_taken}')
-    draw_edges(last_solvable_instance)
+    if last_solvable_instance:
+        draw_edges(last_solvable_instance)
     print(f'First unsolvable instance has {num_points} points:')
+
+
+def benchmark_backends(directory='instances', backends=None, min_points=0, max_points=None, time_limit=None,
+                       store=None):
+    """
+    Solve the instances of a directory (or archive, see InstanceSet) with BTSPSolverIP on
+    every backend and print the solver time per instance and backend.
+    :param backends: Names of the backends, all available ones by default (see available_backends).
+    :param time_limit: Time limit per solve in seconds, after which the backend is skipped
+        for the larger instances.
+    :param store: Optional ResultStore, see benchmark_average_time.
+    """
+    backends = list(backends or available_backends())
+    timed_out = set()
+    print('instance'.ljust(12) + ''.join(name.rjust(12) for name in backends))
+    for info, points in InstanceSet(directory).instances(min_points, max_points):
+        times = []
+        for name in backends:
+            params = {'backend': name, 'time_limit': time_limit}
+            result = store.result(info.hash, 'BTSPSolverIP', params) if store is not None else None
+            if result is not None:
+                times.append(result['solver_time'] if result['status'] == 'optimal' else None)
+                continue
+            if name in timed_out:
+                times.append(None)
+                continue
+            start_time = time.time()
+            solver = BTSPSolverIP(points, util.EdgeIndex(points), backend=name)
+            try:
+                with util.suppress_stdout():
+                    sol, time_taken = solver.solve(time_limit=time_limit)
+            except TimeoutError:
+                timed_out.add(name)
+                times.append(None)
+                if store is not None:
+                    store.record(info.hash, 'BTSPSolverIP', params, None, time.time() - start_time, time_limit,
+                                 'timeout')
+                continue
+            times.append(time_taken)
+            if store is not None:
+                store.record(info.hash, 'BTSPSolverIP', params, bottleneck_of(sol), time.time() - start_time,
+                             time_taken, 'optimal')
+        print(info.name.ljust(12) + ''.join(('-' if t is None else f'{t:.3f}').rjust(12) for t in times))
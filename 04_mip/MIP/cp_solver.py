@@ -2,6 +2,8 @@ from ortools.sat.python import cp_model
 import itertools
 import math
 
+from alglab.warm_start import tour_successors, hint_tour
+
 def squared_distance(p1, p2):
     """
     Calculate the squared euclidian distance (in order to minimze the use of the sqrt() operation).
@@ -90,7 +92,6 @@ class BTSPSolverCP:
         self.points = points
         self.n = len(self.points)
         self.model_bottleneck = cp_model.CpModel()
-        self.model_minsum = cp_model.CpModel()
         self.remaining_edges = None
         self.__calculate_distances()
         self.__make_vars()
@@ -98,19 +99,35 @@ class BTSPSolverCP:
         self.__add_bottleneck_constraints(self.model_bottleneck, self.edge_vars)
         self.__add_degree_constraints(self.model_bottleneck, self.edge_vars)
         self.__add_depth_constraints(self.model_bottleneck, self.edge_vars)
-        
-    def __init_minsum(self):
-        self.ms_vars = {(v,w): self.model_minsum.NewBoolVar(f'x_{v},{w}') 
-                            for (v,w) in self.remaining_edges}
-        #self.minsum = self.model_minsum.NewIntVar(0, self.max_distance*len(self.remaining_edges), 's')
-        #self.model_minsum.Add(self.minsum >= sum(x_vw*self.distances[v,w] for (v, w), x_vw in self.ms_vars.items()))
-        self.depth_vars = {v: self.model_minsum.NewIntVar(0, self.n - 1, f'd_{v}') for v in range(self.n)}
-        
-        self.__forbid_bidirectional_edges(self.model_minsum, self.ms_vars)
-        self.__add_degree_constraints(self.model_minsum, self.ms_vars)
-        self.__add_depth_constraints(self.model_minsum, self.ms_vars)
-        self.model_minsum.Minimize(sum(x_vw*self.distances[v,w] for (v, w), x_vw in self.ms_vars.items()))
-        
+
+    def __init_minsum(self, solver, bottleneck):
+        """
+        Turn the bottleneck model into the second stage model in place: the arcs above the
+        optimal bottleneck are fixed to zero, the objective becomes the tour length, and
+        the optimal bottleneck tour of the first stage is the hint.
+        """
+        self.remaining_edges = [e for e in self.edge_vars if self.distances[e] <= bottleneck]
+        for e, x_e in self.edge_vars.items():
+            if self.distances[e] > bottleneck:
+                self.model_bottleneck.Add(x_e == 0)
+        self.model_bottleneck.Add(self.bottleneck_var <= bottleneck)
+        self.model_bottleneck.ClearHints()
+        for x_e in self.edge_vars.values():
+            self.model_bottleneck.AddHint(x_e, solver.Value(x_e))
+        for d_v in self.depth_vars.values():
+            self.model_bottleneck.AddHint(d_v, solver.Value(d_v))
+        self.model_bottleneck.AddHint(self.bottleneck_var, bottleneck)
+        self.model_bottleneck.Minimize(sum(self.distances[e] * self.edge_vars[e] for e in self.remaining_edges))
+
+    def warm_start(self, solution):
+        """
+        Hint a tour (list of edges, e.g. from heuristic_tour) to the solver:
+        the arcs along the tour, starting at point 0, the depths of the points and its bottleneck.
+        """
+        successor = tour_successors(self.points, solution)
+        hint_tour(self.model_bottleneck, self.edge_vars, successor, self.depth_vars)
+        self.model_bottleneck.AddHint(self.bottleneck_var, max(self.distances[v, w] for v, w in successor.items()))
+
     def solve(self):
         """
         Find the optimal solution to the initialized instance.
@@ -126,14 +143,12 @@ class BTSPSolverCP:
             raise RuntimeError("Unexpected status after running solver!") 
             
         # Find solution which minimizes the tour lenght under the bottleneck constraint
-        self.remaining_edges = [e for e, x_e in self.edge_vars.items() if math.dist([e[0]],[e[1]]) <= solver.Value(self.bottleneck_var)]    
-        #print(math.sqrt(solver.Value(self.bottleneck_var)))
-        self.__init_minsum()
-        status = solver.Solve(self.model_minsum)
+        self.__init_minsum(solver, solver.Value(self.bottleneck_var))
+        status = solver.Solve(self.model_bottleneck)
         print(solver.ResponseStats())
         if status == cp_model.INFEASIBLE:
             raise RuntimeError("The model was classified infeasible by the solver!")
         if status != cp_model.OPTIMAL:
             raise RuntimeError("Unexpected status after running solver!")
             
-        return [(self.points[v], self.points[w]) for (v,w),x_vw in self.ms_vars.items() if solver.Value(x_vw) != 0]
\ No newline at end of file
+        return [(self.points[v], self.points[w]) for (v,w),x_vw in self.edge_vars.items() if solver.Value(x_vw) != 0]
\ No newline at end of file
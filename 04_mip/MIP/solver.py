@@ -1,188 +1,417 @@
-import gurobipy as grb
-import itertools
-import networkx as nx
 import math
+import time
+from typing import List, Optional, Set
+
+import numpy as np
+from scipy.sparse import csr_matrix, diags, hstack
+from scipy.sparse.csgraph import breadth_first_order, connected_components, maximum_flow
+
 from MIP import util
+from MIP.backend import BACKENDS, OPTIMAL, INFEASIBLE, TIME_LIMIT, Rows
+from alglab.bounds import lower_bound_index
+from alglab.connectivity import ThresholdConnectivity
+
+# Edge values are scaled to integer capacities for the max-flow computations.
+CUT_SCALE = 10 ** 6
+# A cut of the scaled support graph is only added if x(delta(S)) < 2 - CUT_TOLERANCE holds for
+# the unscaled values, as the rounding of the capacities can make a satisfied cut look violated.
+CUT_TOLERANCE = 1e-3
 
 
 class BTSPSolverIP:
     def __make_vars(self):
-        # Create binary variables for every *undirected* edge
-        self.bnvars = {e: self.model_bottleneck.addVar(lb=0, ub=1, vtype=grb.GRB.BINARY) for e in self.all_edges}
-        # Create a fractional variable (vtype=grb.GRB.CONTINUOUS) for the bottleneck length
-        self.l = self.model_bottleneck.addVar(lb=0, ub=math.dist(*self.all_edges[-1]), vtype=grb.GRB.CONTINUOUS)
+        m = len(self.lengths)
+        # Create binary variables for every *undirected* edge, the columns x, ..., x + m - 1
+        self.x = self.backend.add_columns(np.zeros(m), np.ones(m), np.zeros(m), integer=True)
+        # Create a fractional variable for the bottleneck length, the first objective
+        self.l = self.backend.add_columns([0.0], [self.lengths[-1]], [1.0], integer=False)
+        self.columns = self.l + 1
 
-    def __add_degree_bounds(self, model, varmap: dict):
+    def __make_edge_arrays(self):
         """
-        Enforce the degree constraint.
-        This implementation accepts a dictionary for the edge variables,
-        which is useful for use in multiple models.
+        The edges as arrays of point indices (into points_list) and their lengths, in the
+        order of all_edges, and a key per undirected edge to find the edges of a tour.
         """
-        for v in self.points:
-            edgevars = 0
-            for e in self.edges_of[v]:
-                if e in varmap:
-                    edgevars += varmap[e]
-            model.addConstr(edgevars == 2)
+        if isinstance(self.all_edges, util.EdgeIndex):
+            # map the point indices of the EdgeIndex to the ones of points_list
+            index = np.array([self.index_of[p] for p in self.all_edges.nodes], dtype=np.int64)
+            self.u, self.v = index[self.all_edges.u], index[self.all_edges.v]
+            self.lengths = np.sqrt(self.all_edges.d2)
+        else:
+            self.u = np.array([self.index_of[e[0]] for e in self.all_edges], dtype=np.int64)
+            self.v = np.array([self.index_of[e[1]] for e in self.all_edges], dtype=np.int64)
+            self.lengths = np.array([math.dist(*e) for e in self.all_edges])
+        self.keys = self.__edge_keys(self.u, self.v)
+
+    def __edge_keys(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        n = len(self.points_list)
+        return np.minimum(a, b) * n + np.maximum(a, b)
 
-    def __add_total_edges(self, model, varmap: dict):
+    def __edge_columns(self, edges: np.ndarray) -> np.ndarray:
+        return self.x + edges
+
+    def __add_degree_bounds(self):
         """
-        Enforce the constraint sum(x_e) = n
+        Enforce the degree constraint A x = 2, with the sparse point-edge incidence matrix A.
         """
-        model.addConstr(sum(varmap.values()) == len(self.points))
+        m, n = len(self.lengths), len(self.points_list)
+        incidence = csr_matrix((np.ones(2 * m), (np.concatenate((self.u, self.v)),
+                                                 np.tile(self.__edge_columns(np.arange(m)), 2))),
+                               shape=(n, self.columns))
+        self.backend.add_rows(incidence, np.full(n, 2.0), np.full(n, 2.0))
 
-    def __make_edges(self):
-        edges_of = {p: list() for p in self.points}
-        for e in self.all_edges:
-            edges_of[e[0]].append(e)
-            edges_of[e[1]].append(e)
-        return edges_of
+    def __add_total_edges(self):
+        """
+        Enforce the constraint sum(x_e) = n
+        """
+        m, n = len(self.lengths), len(self.points_list)
+        total = csr_matrix((np.ones(m), (np.zeros(m, dtype=np.int64), self.__edge_columns(np.arange(m)))),
+                           shape=(1, self.columns))
+        self.backend.add_rows(total, np.array([n], dtype=float), np.array([n], dtype=float))
 
     def __add_bottleneck_constraints(self):
         """
-        Enforce the bottleneck constraints.
-        """
-        for e, x_e in self.bnvars.items():
-            self.model_bottleneck.addConstr(self.l >= math.dist(*e) * x_e)
-
-    def __get_integral_solution(self, model, varmap: dict) -> nx.Graph:
-        """
-        Constructs a graph from the current solution of the given model.
-        To be used inside of a callback.
-        """
-        variables = [x_e for e, x_e in varmap.items()]
-        values = model.cbGetSolution(variables)
-        graph = nx.empty_graph()
-        graph.add_nodes_from(self.points)
-        for i, (e, x_e) in enumerate(varmap.items()):
-            # x_e has value v in the current solution
-            v = values[i]
-            if v >= 0.5:  # the values are not always 0 or 1 due to numerical errors
-                graph.add_edge(e[0], e[1])
-        return graph
-
-    def __forbid_component(self, model, varmap: dict, component):
-        """
-        Forbid the occurence of multiple, disconnected components, by enforcing
-        leaving edges for all occuring components.
-        """
-        crossing_edges = 0
-        for v in component:
-            for e in self.edges_of[v]:
-                if e in varmap:
-                    target = e[0] if e[0] != v else e[1]
-                    if target not in component:
-                        crossing_edges += varmap[e]
-        # The constraint is added using "cbLazy" instaed of "addConstr" in a callback.
-        model.cbLazy(crossing_edges >= 1)
-
-    def __callback_integral(self, model, varmap):
-        # Check whether the solution is connected
-        graph = self.__get_integral_solution(model, varmap)
-        components = list(nx.connected_components(graph))
-
-        if len(components) == 1:
-            # Graph is connected. Do nothing!
-            return
-        else:
+        Enforce the bottleneck constraints l - dist(e) * x_e >= 0, as one block of rows.
+        """
+        m = len(self.lengths)
+        rows = hstack((csr_matrix((m, self.x)), -diags(self.lengths), np.ones((m, 1)))).tocsr()
+        self.backend.add_rows(rows, np.zeros(m), np.full(m, np.inf))
+
+    def __crossing(self, component: np.ndarray) -> np.ndarray:
+        """
+        The positions of the edges with exactly one end in the point index set component.
+        """
+        inside = np.zeros(len(self.points_list), dtype=bool)
+        inside[component] = True
+        return np.flatnonzero(inside[self.u] != inside[self.v])
+
+    def __cut_rows(self, components: List[np.ndarray]) -> Rows:
+        """
+        The subtour elimination constraints x(delta(S)) >= 2 for point index sets S, as one
+        block of rows over the edges with exactly one end in S.
+        """
+        crossing = [self.__edge_columns(self.__crossing(component)) for component in components]
+        indptr = np.concatenate(([0], np.cumsum([len(c) for c in crossing])))
+        matrix = csr_matrix((np.ones(indptr[-1]), np.concatenate(crossing), indptr),
+                            shape=(len(components), self.columns))
+        return matrix, np.full(len(components), 2.0), np.full(len(components), np.inf)
+
+    def __edge_values(self, values: np.ndarray) -> np.ndarray:
+        return values[self.x:self.x + len(self.lengths)]
+
+    def __separate_integral(self, values: np.ndarray) -> Optional[Rows]:
+        """
+        Forbid the occurence of multiple, disconnected components in an integral solution,
+        by enforcing leaving edges for all occuring components.
+        """
+        cut_start = time.perf_counter()
+        # the values are not always 0 or 1 due to numerical errors
+        chosen = self.__edge_values(values) >= 0.5
+        n = len(self.points_list)
+        graph = csr_matrix((np.ones(int(chosen.sum())), (self.u[chosen], self.v[chosen])), shape=(n, n))
+        count, labels = connected_components(graph, directed=False)
+        rows = None
+        if count > 1:
             # Make components connected.
-            for component in components:
-                self.__forbid_component(model, varmap, component)
-
-    def __callback_fractional(self, model, varmap):
-        # Nothing has to be done in here.
-        # Some more advanced techniques can be used to add helpful constraints
-        # just from looking at a fractional solution, but this exceeds the scope
-        # of this course. It can still be interesting to analyze fractional solutions
-        # that the solver comes up with.
-        pass
-
-    def callback(self, where, model, varmap):
-        if where == grb.GRB.Callback.MIPSOL:
-            # we have an integral solution (potentially valid solution)
-            self.__callback_integral(model, varmap)
-        elif where == grb.GRB.Callback.MIPNODE and \
-                model.cbGet(grb.GRB.Callback.MIPNODE_STATUS) == grb.GRB.OPTIMAL:
-            # we have a fractional solution
-            # (intermediate solution with fractional values for all booleans)
-            self.__callback_fractional(model, varmap)
-
-    def __init__(self, points, edges):
-        self.points = points
-        self.all_edges = edges
-        self.edges_of = self.__make_edges()
-        self.model_bottleneck = grb.Model()  # "First stage" model for finding the bottleneck edge
-        self.model_min_tour = grb.Model()  # "Second stage" model for finding the cost-minimal TSP tour with fixed bottleneck.
+            self.stats['cut_rounds'] += 1
+            components = [np.flatnonzero(labels == c) for c in range(count)]
+            self.learned_cuts += components
+            rows = self.__cut_rows(components)
+        self.stats['cut_time'] += time.perf_counter() - cut_start
+        return rows
+
+    def __get_fractional_support(self, values: np.ndarray) -> csr_matrix:
+        """
+        Constructs the support graph of a fractional solution as symmetric sparse matrix
+        over the point indices: every edge with a positive value, with the value (scaled
+        to an integer by CUT_SCALE) as capacity. The endpoints are taken from the edge
+        arrays of the model (see __make_edge_arrays).
+        """
+        values = self.__edge_values(values)
+        support = np.flatnonzero(values > 1e-6)
+        u, v = self.u[support], self.v[support]
+        capacity = np.rint(values[support] * CUT_SCALE).astype(np.int32)
+        n = len(self.index_of)
+        return csr_matrix((np.concatenate((capacity, capacity)), (np.concatenate((u, v)), np.concatenate((v, u)))),
+                          shape=(n, n))
+
+    def __violated_cuts(self, graph: csr_matrix) -> List[Set[int]]:
+        """
+        Return point index sets S with x(delta(S)) < 2 in the support graph, at most max_node_cuts.
+        If the support graph is disconnected, its components are such sets. Otherwise Gusfield's
+        variant of the Gomory-Hu algorithm computes a minimum cut between every point and its
+        current tree neighbour (n-1 max-flow computations), and every cut of value < 2 is one.
+        """
+        count, labels = connected_components(graph, directed=False)
+        if count > 1:
+            return [set(np.flatnonzero(labels == c).tolist()) for c in range(min(count, self.max_node_cuts))]
+        n = graph.shape[0]
+        parent = [0] * n
+        cuts = []
+        for i in range(1, n):
+            flow = maximum_flow(graph, i, parent[i])
+            residual = graph - flow.flow
+            residual.data[residual.data < 0] = 0
+            residual.eliminate_zeros()
+            side = set(breadth_first_order(residual, i, directed=True, return_predecessors=False).tolist())
+            if flow.flow_value < (2 - 1e-6) * CUT_SCALE:
+                # the smaller side gives the sparser constraint
+                cut = side if 2 * len(side) <= n else set(range(n)) - side
+                if cut not in cuts:
+                    cuts.append(cut)
+                if len(cuts) >= self.max_node_cuts:
+                    break
+            for j in range(i + 1, n):
+                if j in side and parent[j] == parent[i]:
+                    parent[j] = i
+        return cuts
+
+    def __separate_fractional(self, values: np.ndarray) -> Optional[Rows]:
+        """
+        Separate subtour elimination constraints x(delta(S)) >= 2 on a fractional solution
+        (the node relaxation for Gurobi, the LP relaxation for the open solvers). They tighten
+        the relaxation, so fewer nodes have to be explored. The separation stops once it has
+        used up separation_time seconds in total.
+        """
+        if self.stats['separation_time'] >= self.separation_time:
+            return None
+        cut_start = time.perf_counter()
+        edge_values = self.__edge_values(values)
+        components = [np.array(sorted(cut), dtype=np.int64)
+                      for cut in self.__violated_cuts(self.__get_fractional_support(values))]
+        # the cuts must also be violated by the unscaled values, see CUT_TOLERANCE
+        components = [component for component in components
+                      if edge_values[self.__crossing(component)].sum() < 2 - CUT_TOLERANCE]
+        rows = None
+        if components:
+            self.stats['separation_rounds'] += 1
+            self.stats['fractional_cuts'] += len(components)
+            self.learned_cuts += components
+            rows = self.__cut_rows(components)
+        elapsed = time.perf_counter() - cut_start
+        self.stats['separation_time'] += elapsed
+        self.stats['cut_time'] += elapsed
+        return rows
+
+    def __init__(self, points, edges=None, max_node_cuts: int = 20, separation_time: float = 10.0,
+                 backend: str = "gurobi"):
+        """
+        :param edges: All edges sorted by length, as EdgeIndex or list. Built from the points if not given.
+        :param max_node_cuts: Most subtour cuts added to one fractional node solution.
+        :param separation_time: Seconds that the fractional separation may spend per model,
+            0 to only cut off integral solutions.
+        :param backend: The MIP solver, one of backend.available_backends().
+        """
+        # Seconds spent per phase: incidence lists and edge arrays, model building (sparse
+        # row blocks), the connectivity
+        # separation (part of the solver runtime, separation_time of it on fractional
+        # solutions) and reading the solution; the number and solver runtime of the
+        # feasibility probes of the threshold search.
+        self.stats = {'edges_time': 0.0, 'build_time': 0.0, 'cut_time': 0.0, 'cut_rounds': 0, 'extract_time': 0.0,
+                      'separation_time': 0.0, 'separation_rounds': 0, 'fractional_cuts': 0,
+                      'probes': 0, 'probe_time': 0.0}
+        self.max_node_cuts = max_node_cuts
+        self.separation_time = separation_time
+        # Point index arrays of the subtour cuts found so far. Gurobi drops lazy constraints and
+        # user cuts after optimize, the threshold search and the second stage add them as rows.
+        self.learned_cuts = []
+        self.added_cuts = 0  # how many of learned_cuts are rows of the model
+        start = time.perf_counter()
+        self.points = points  # (x,y)-tuples or an (n, 2) coordinate array
+        self.points_list = util.node_list(points)
+        self.all_edges = edges if edges is not None else util.EdgeIndex(points)
+        self.index_of = {p: i for i, p in enumerate(self.points_list)}
+        self.__make_edge_arrays()
+        self.stats['edges_time'] = time.perf_counter() - start
+        start = time.perf_counter()
+        # "First stage" model for finding the bottleneck edge. It becomes the "second stage" model
+        # for finding the cost-minimal TSP tour with fixed bottleneck in place, see __init_min_tour.
+        self.backend = BACKENDS[backend]()
         self.remaining_edges = None
+        self.incumbent = None  # the warm start tour
         self.__make_vars()
-        self.__add_degree_bounds(self.model_bottleneck, self.bnvars)
-        self.__add_total_edges(self.model_bottleneck, self.bnvars)
+        self.__add_degree_bounds()
+        self.__add_total_edges()
         self.__add_bottleneck_constraints()
-        # Give the solver a heads up that lazy constraints will be utilized
-        self.model_bottleneck.Params.lazyConstraints = 1
-        # Set the first objective
-        self.model_bottleneck.setObjective(self.l, grb.GRB.MINIMIZE)
-
-    def __init_min_tour_model(self):
-        """
-        Set up variables, constraints and objective function for the
-        second stage model.
-        """
-        # Create binary variables (vtype=grb.GRB.BINARY) for all edges
-        self.msvars = {e: self.model_min_tour.addVar(lb=0, ub=1, vtype=grb.GRB.BINARY)
-                       for e in self.remaining_edges}
-        self.__add_degree_bounds(self.model_min_tour, self.msvars)
-        self.__add_total_edges(self.model_min_tour, self.msvars)
-        self.model_min_tour.Params.lazyConstraints = 1
-        self.minsum = sum((math.dist(*e) * x_e for e, x_e in self.msvars.items()))
-        self.model_min_tour.setObjective(self.minsum, grb.GRB.MINIMIZE)
-
-    def __solve_bottleneck_greedy(self, start, bottleneck):
-        # use greedy start solution if available
-        self.model_bottleneck.NumStart = 1
-        self.model_bottleneck.update()
-        self.model_bottleneck.params.StartNumber = 0
-        vars = self.model_bottleneck.getVars()
-        for i, v in enumerate(vars[:len(vars) - 2]):
-            v.Start = start[i]
-        vars[len(vars) - 1].Start = bottleneck
-
-        return self.__solve_bottleneck()
-
-    def __solve_bottleneck(self):
-        # Find the optimal bottleneck (first stage)
-        cb_bn = lambda model, where: self.callback(where, model, self.bnvars)
-        self.model_bottleneck.optimize(cb_bn)
-        if self.model_bottleneck.status == grb.GRB.TIME_LIMIT:
+        self.stats['build_time'] = time.perf_counter() - start
+
+    def __bottleneck_objective(self) -> np.ndarray:
+        objective = np.zeros(self.columns)
+        objective[self.l] = 1
+        return objective
+
+    def __optimize(self, time_limit: Optional[float]) -> str:
+        """
+        Solve the model with the subtour separation. Returns OPTIMAL or INFEASIBLE.
+        """
+        status = self.backend.optimize(self.__separate_integral, self.__separate_fractional, time_limit)
+        if status == TIME_LIMIT:
             raise TimeoutError('Time limit reached')
-        if self.model_bottleneck.status != grb.GRB.OPTIMAL:
-            raise RuntimeError(f"Unexpected status: {self.model_bottleneck.status} after optimization!")
-        bottleneck = self.model_bottleneck.objVal
+        return status
+
+    def __solution(self) -> list:
+        # all edges with value >= 0.5 (numerical reasons)
+        chosen = np.flatnonzero(self.__edge_values(self.backend.values()) >= 0.5)
+        return [self.all_edges[i] for i in chosen.tolist()]
+
+    def __start(self, in_tour: np.ndarray, bottleneck: float):
+        start = np.zeros(self.columns)
+        start[self.x:self.x + len(self.lengths)] = in_tour
+        start[self.l] = bottleneck
+        self.backend.set_start(start)
+
+    def __init_min_tour(self, solution):
+        """
+        Turn the first stage model into the second stage model in place: the edges longer
+        than the bottleneck get the upper bound 0, the objective becomes the tour length and
+        the optimal bottleneck tour is the start solution. The degree constraints stay, and the
+        subtour cuts learned so far are added as rows, so they need not be found again.
+        """
+        in_tour = self.__tour_vector(solution)
+        # the lengths of the same array, so the bottleneck edge is not lost by rounding
+        bottleneck = self.lengths[in_tour > 0].max()
+        remaining = self.lengths <= bottleneck
+        self.backend.set_bounds(self.x, np.zeros(len(remaining)), remaining.astype(float))
+        self.__start(in_tour, bottleneck)
+        self.__add_learned_cuts()
+        self.minsum = np.zeros(self.columns)
+        self.minsum[self.x:self.x + len(self.lengths)] = self.lengths * remaining
+        self.backend.set_objective(self.minsum)
+
+    def __tour_vector(self, solution) -> np.ndarray:
+        """
+        The tour (list of edges) as 0/1 vector over all_edges.
+        """
+        a = np.array([self.index_of[v] for v, w in solution], dtype=np.int64)
+        b = np.array([self.index_of[w] for v, w in solution], dtype=np.int64)
+        return np.isin(self.keys, self.__edge_keys(a, b)).astype(float)
+
+    def warm_start(self, solution):
+        """
+        Use a tour (list of edges, e.g. from heuristic_tour or an earlier run) as MIP start.
+        """
+        self.__start(self.__tour_vector(solution), max(math.dist(*e) for e in solution))
+        self.incumbent = list(solution)
+
+    def __solve_bottleneck_greedy(self, start, bottleneck, time_limit):
+        # use greedy start solution if available, a 0/1 vector over self.all_edges
+        self.__start(np.asarray(start, dtype=float), bottleneck)
+        self.incumbent = [e for e, value in zip(self.all_edges, start) if value]
+
+        return self.__solve_bottleneck(time_limit)
+
+    def __solve_bottleneck(self, time_limit):
+        # Find the optimal bottleneck (first stage)
+        if self.__optimize(time_limit) != OPTIMAL:
+            raise RuntimeError("Unexpected status: infeasible after optimization!")
+        bottleneck = self.backend.objective_value()
         print(f"[DBST SOLVER]: Found the optimal bottleneck! Bottleneck length is {bottleneck}")
+        start = time.perf_counter()
+        solution = self.__solution()
+        # the objective value is only exact up to the tolerances, the tour has the exact bottleneck
+        bottleneck = max(math.dist(*e) for e in solution)
         self.remaining_edges = [e for e in self.all_edges if math.dist(*e) <= bottleneck]
-        return [e for e, x_e in self.bnvars.items() if x_e.x >= 0.5]
-
-    def __solve_min_tour(self):
-        # Find the optimal tree (second stage)
-        self.__init_min_tour_model()
-        cb_ms = lambda model, where: self.callback(where, model, self.msvars)
-        self.model_min_tour.optimize(cb_ms)
-        if self.model_bottleneck.status != grb.GRB.OPTIMAL:
+        self.stats['extract_time'] += time.perf_counter() - start
+        return solution
+
+    def __add_learned_cuts(self):
+        """
+        Add the subtour cuts learned since the last call as rows x(delta(S)) >= 2, unless
+        the backend keeps the separated rows anyway.
+        """
+        new = self.learned_cuts[self.added_cuts:]
+        if new and not self.backend.keeps_cuts:
+            self.backend.add_rows(*self.__cut_rows(new))
+        self.added_cuts = len(self.learned_cuts)
+
+    def __probe_threshold(self, position, time_limit):
+        """
+        Is there a tour that only uses the edges up to all_edges[position]? All longer edges
+        get the upper bound 0, so the model is changed instead of rebuilt.
+        Returns the tour or None.
+        """
+        m = len(self.lengths)
+        self.backend.set_bounds(self.x, np.zeros(m), (np.arange(m) <= position).astype(float))
+        self.__add_learned_cuts()
+        status = self.__optimize(time_limit)
+        self.stats['probes'] += 1
+        self.stats['probe_time'] += self.backend.runtime
+        if status == INFEASIBLE:
+            return None
+        return self.__solution()
+
+    def __lower_bound(self) -> int:
+        """
+        The first position in all_edges that can be the bottleneck of a tour, from the degree
+        and biconnectivity bounds of alglab.bounds.
+        """
+        if isinstance(self.all_edges, util.EdgeIndex):
+            return lower_bound_index(ThresholdConnectivity(self.all_edges), tour=True)
+        # a list of edges, the bound is taken over as length
+        edge_index = util.EdgeIndex(self.points_list)
+        bound = math.sqrt(edge_index.d2[lower_bound_index(ThresholdConnectivity(edge_index), tour=True)])
+        return int(np.searchsorted(self.lengths, bound * (1 - 1e-12)))
+
+    def __solve_bottleneck_threshold(self, time_limit):
+        """
+        Find the optimal bottleneck by a binary search over the sorted edges: every probe is
+        a Hamiltonian cycle feasibility problem on the edges up to a threshold, which avoids
+        the weak LP bound of the l >= dist(e) * x_e constraints. The search starts between
+        the lower bound (see __lower_bound) and the bottleneck of the warm start.
+        """
+        m = len(self.lengths)
+        lo = self.__lower_bound()
+        solution = self.incumbent
+        hi = m - 1 if solution is None else int(np.flatnonzero(self.__tour_vector(solution)).max())
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.backend.set_objective(np.zeros(self.columns))
+        try:
+            while lo < hi or solution is None:
+                mid = (lo + hi) // 2
+                tour = self.__probe_threshold(mid, None if deadline is None else deadline - time.perf_counter())
+                if tour is None:
+                    lo = mid + 1
+                else:
+                    solution = tour
+                    hi = int(np.flatnonzero(self.__tour_vector(tour)).max())
+        finally:
+            # the model is left as before, with all edges and the bottleneck objective
+            self.backend.set_bounds(self.x, np.zeros(m), np.ones(m))
+            self.backend.set_objective(self.__bottleneck_objective())
+        bottleneck = math.dist(*self.all_edges[hi])
+        print(f"[DBST SOLVER]: Found the optimal bottleneck! Bottleneck length is {bottleneck}")
+        self.remaining_edges = [e for e in self.all_edges if math.dist(*e) <= bottleneck]
+        return solution
+
+    def __solve_min_tour(self, solution, time_limit):
+        # Find the optimal tour (second stage), starting from the optimal bottleneck tour
+        self.__init_min_tour(solution)
+        if self.__optimize(time_limit) != OPTIMAL:
             raise RuntimeError("Unexpected status after optimization!")
-        # Return all edges with value >= 0.5 (numerical reasons)
-        print(f"[DBST SOLVER]: Found the optimal tour! Total cost: {self.model_min_tour.objVal}")
-        return [e for e, x_e in self.msvars.items() if x_e.x >= 0.5]
+        print(f"[DBST SOLVER]: Found the optimal tour! Total cost: {self.backend.objective_value()}")
+        return self.__solution()
 
-    def solve(self, start=None, bottleneck=-1, min_tour=False):
-        if start:
-            btsp_edges = self.__solve_bottleneck_greedy(start, bottleneck)
+    def solve(self, start=None, bottleneck=-1, min_tour=False, threshold_search=False,
+              time_limit: Optional[float] = None):
+        """
+        :param threshold_search: Find the bottleneck by a binary search with feasibility
+            probes (see __solve_bottleneck_threshold) instead of minimizing l.
+        :param time_limit: Optional parameter. Seconds per stage, a TimeoutError is raised when reached.
+        """
+        if threshold_search:
+            if start:
+                self.incumbent = [e for e, value in zip(self.all_edges, start) if value]
+            btsp_edges = self.__solve_bottleneck_threshold(time_limit)
+            bottleneck_time = self.stats['probe_time']
+        elif start:
+            btsp_edges = self.__solve_bottleneck_greedy(start, bottleneck, time_limit)
+            bottleneck_time = self.backend.runtime
         else:
-            btsp_edges = self.__solve_bottleneck()
-        bottleneck_time = self.model_bottleneck.getAttr(grb.GRB.Attr.Runtime)
+            btsp_edges = self.__solve_bottleneck(time_limit)
+            bottleneck_time = self.backend.runtime
         if min_tour:
             util.draw_edges(btsp_edges)
-            min_tour_sol = self.__solve_min_tour()
-            min_tour_time = self.model_min_tour.getAttr(
-                grb.GRB.Attr.Runtime)
+            min_tour_sol = self.__solve_min_tour(btsp_edges, time_limit)
+            min_tour_time = self.backend.runtime
             return min_tour_sol, bottleneck_time, min_tour_time
         return btsp_edges, bottleneck_time
@@ -0,0 +1,44 @@
+import random
+import unittest
+
+import numpy as np
+
+from . import util
+from .backend import available_backends
+from .solver import BTSPSolverIP
+
+
+def instance_points():
+    random.seed(3)
+    return util.random_points(14)
+
+
+class SeparationTestCase(unittest.TestCase):
+    def test_rounded_capacities(self):
+        # a tour in which the capacities of the point 2 are rounded down by 2 units in total
+        solver = BTSPSolverIP(instance_points(), backend=available_backends()[0])
+        n, m = len(solver.points_list), len(solver.lengths)
+        order = list(range(n))
+        values = np.zeros(m + 1)
+        positions = {}
+        for a, b in zip(order, order[1:] + order[:1]):
+            position = int(np.flatnonzero(solver.keys == min(a, b) * n + max(a, b))[0])
+            positions[a, b] = position
+            values[position] = 1
+        values[positions[1, 2]] -= 1.8e-6
+        others = np.flatnonzero(((solver.u == 2) | (solver.v == 2)) & (values[:m] == 0))[:3]
+        values[others] = 0.6e-6
+        self.assertIsNone(solver._BTSPSolverIP__separate_fractional(values))
+
+    @unittest.skipUnless('highs' in available_backends(), "needs ortools with HiGHS")
+    def test_highs_cut_rounds(self):
+        solver = BTSPSolverIP(instance_points(), backend='highs')
+        with util.suppress_stdout():
+            solver.solve()
+        cuts = [tuple(cut.tolist()) for cut in solver.learned_cuts]
+        self.assertEqual(len(cuts), len(set(cuts)))
+        self.assertLess(solver.backend.rounds, 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
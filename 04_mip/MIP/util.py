@@ -1,13 +1,19 @@
 from typing import List, Set, Tuple, Iterable, Optional
 import matplotlib.pyplot as plt
 import networkx as nx
-import itertools
 import random
 from json import dumps, loads, JSONEncoder, JSONDecoder
 import pickle
-from contextlib import contextmanager
 import sys, os
 
+# The modules shared by all sheets live in the package 'alglab' at the repository root.
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+from alglab.util import EdgeIndex, node_list, as_node_set, suppress_stdout, as_python_object, INSTANCE_MAGIC, \
+    write_points, read_points, parse_points, parse_json_points, read_json_points, instance_hash, convert_instance
+
 Node = Tuple[int, int]
 Edge = Tuple[Node, Node]
 
@@ -24,9 +30,7 @@ def all_edges_sorted(points: Iterable[Node]) -> List[Node]:
     Create a list containing all edges between each two points of the given
     point set/list and returns them in sorted, ascending order. 
     """
-    edges = [(v, w) for v, w in itertools.combinations(points, 2)]
-    edges.sort(key=lambda e: squared_distance(*e))  # *e is like e[0], e[1]
-    return edges
+    return EdgeIndex(points).as_tuples()
 
 
 def draw_edges(edges):
@@ -66,28 +70,29 @@ class PythonObjectEncoder(JSONEncoder):
             return super().default(obj)
 
 
-def export_instance(filename, points):
-    with open("instances/" + filename, "w") as f:
+def export_instance(filename, points, directory="instances"):
+    """
+    Save an instance to the instances folder. Files ending in '.pts' are written in the
+    binary format (see write_points), other names in the old pickle-in-JSON format.
+    """
+    path = os.path.join(directory, filename)
+    if filename.endswith(".pts"):
+        write_points(path, points)
+        return
+    with open(path, "w") as f:
         f.write(dumps(points, cls=PythonObjectEncoder))
 
 
-def as_python_object(dct):
-    if '_python_object' in dct:
-        return pickle.loads(dct['_python_object'].encode('latin-1'))
-    return dct
-
-
-def import_instance(filename) -> Set[Node]:
-    with open("instances/" + filename, "r") as f:
+def import_instance(filename, directory="instances"):
+    """
+    Load an instance from the instances folder: a binary instance as (n, 2) coordinate
+    array (see read_points), which the solvers take as it is, an instance in the old
+    JSON format as the saved set of (x,y)-tuples.
+    """
+    path = os.path.join(directory, filename)
+    with open(path, "rb") as f:
+        binary = f.read(len(INSTANCE_MAGIC)) == INSTANCE_MAGIC
+    if binary:
+        return read_points(path)
+    with open(path, "r") as f:
         return loads(f.read(), object_hook=as_python_object)
-
-
-@contextmanager
-def suppress_stdout():
-    with open(os.devnull, "w") as devnull:
-        old_stdout = sys.stdout
-        sys.stdout = devnull
-        try:
-            yield
-        finally:
-            sys.stdout = old_stdout
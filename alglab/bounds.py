@@ -0,0 +1,51 @@
+"""
+Lower bounds for the index of the bottleneck edge, computed on the sorted edge
+arrays of an EdgeIndex before the search starts. Every bound is the smallest
+edge index whose threshold graph (all edges up to and including this index) has
+a property that the threshold graph of every feasible solution needs.
+"""
+import networkx as nx
+
+
+def biconnectivity_index(edge_index, start: int) -> int:
+    """
+    Return the smallest edge index at which the threshold graph is 2-connected.
+    'start' has to be a lower bound for this index, e.g. the maximum of the
+    connectivity and the degree-2 index. The answer is usually close to it, so the
+    search gallops upwards from there before it bisects.
+    """
+    n, m = edge_index.n, len(edge_index)
+    if n < 3:
+        return start
+
+    def biconnected(index):
+        g = nx.Graph()
+        g.add_nodes_from(range(n))
+        g.add_edges_from(zip(edge_index.u[:index + 1].tolist(), edge_index.v[:index + 1].tolist()))
+        return nx.is_biconnected(g)
+
+    lo, hi, step = start - 1, start, n  # lo is not 2-connected, hi is the candidate
+    while not biconnected(hi):
+        lo, hi = hi, min(hi + step, m - 1)
+        step *= 2
+    while lo < hi - 1:
+        mid = (lo + hi) // 2
+        if biconnected(mid):
+            hi = mid
+        else:
+            lo = mid
+    return hi
+
+
+def lower_bound_index(connectivity, tour: bool) -> int:
+    """
+    Return the smallest edge index that can be the bottleneck of a solution,
+    using the Kruskal pass of a ThresholdConnectivity oracle.
+    Every spanning tree needs a connected threshold graph. A tour additionally
+    needs degree 2 at every vertex and a 2-connected threshold graph.
+    """
+    bound = connectivity.connected_at
+    if tour:
+        bound = max(bound, connectivity.min_degree_index(2))
+        bound = biconnectivity_index(connectivity.edge_index, bound)
+    return bound
@@ -0,0 +1,85 @@
+"""
+Sparse candidate edge sets for the bottleneck solvers.
+All functions work on the sorted edge arrays of an EdgeIndex and return a
+boolean mask over its edge positions (mask[i] is True if the i-th shortest
+edge is a candidate).
+"""
+import numpy as np
+
+
+def edge_positions(edge_index, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Look up the positions in the sorted edge order of the edges a[i]b[i],
+    given as arrays of point indices.
+    """
+    n = edge_index.n
+    keys = edge_index.u.astype(np.int64) * n + edge_index.v  # u < v for every edge
+    order = np.argsort(keys)
+    lo, hi = np.minimum(a, b).astype(np.int64), np.maximum(a, b)
+    return order[np.searchsorted(keys, lo * n + hi, sorter=order)]
+
+
+def solution_positions(edge_index, solution) -> np.ndarray:
+    """
+    Look up the positions in the sorted edge order of the edges of a solution (list of edges).
+    """
+    a = np.array([edge_index.index_of[v] for v, w in solution], dtype=np.int64)
+    b = np.array([edge_index.index_of[w] for v, w in solution], dtype=np.int64)
+    return edge_positions(edge_index, a, b)
+
+
+def knn_mask(edge_index, k: int) -> np.ndarray:
+    """
+    Mark every edge vw for which w is one of the k nearest neighbours of v, or the other way around.
+    """
+    m = len(edge_index)
+    ends = np.concatenate((edge_index.u, edge_index.v))
+    ids = np.concatenate((np.arange(m), np.arange(m)))
+    # group the edge positions by endpoint, ascending by length within every group
+    order = np.lexsort((ids, ends))
+    ends, ids = ends[order], ids[order]
+    first = np.searchsorted(ends, np.arange(edge_index.n))
+    rank = np.arange(2 * m) - first[ends]
+    mask = np.zeros(m, dtype=bool)
+    mask[ids[rank < k]] = True
+    return mask
+
+
+def delaunay_mask(edge_index) -> np.ndarray:
+    """
+    Mark the edges of the Delaunay triangulation. This needs scipy.
+    """
+    from scipy.spatial import Delaunay, QhullError
+    if edge_index.n < 4:
+        return np.ones(len(edge_index), dtype=bool)
+    try:
+        simplices = Delaunay(edge_index.coords).simplices
+    except QhullError:
+        # degenerate (e.g. collinear) point sets have no triangulation
+        return knn_mask(edge_index, 2)
+    a = np.concatenate((simplices[:, 0], simplices[:, 1], simplices[:, 2]))
+    b = np.concatenate((simplices[:, 1], simplices[:, 2], simplices[:, 0]))
+    mask = np.zeros(len(edge_index), dtype=bool)
+    mask[edge_positions(edge_index, a, b)] = True
+    return mask
+
+
+def candidate_mask(edge_index, method: str, k: int = 8) -> np.ndarray:
+    """
+    Create the initial candidate set, either 'knn' (k nearest neighbours)
+    or 'delaunay' (Delaunay triangulation plus the k nearest neighbours).
+    """
+    if method == "knn":
+        return knn_mask(edge_index, k)
+    if method == "delaunay":
+        return delaunay_mask(edge_index) | knn_mask(edge_index, k)
+    raise ValueError(f"Unknown candidate method '{method}'!")
+
+
+def shortest_crossing_edges(edge_index, in_component: np.ndarray, count: int) -> np.ndarray:
+    """
+    Return the positions of the 'count' shortest edges leaving a vertex set,
+    given as a boolean mask over the point indices.
+    """
+    crossing = in_component[edge_index.u] != in_component[edge_index.v]
+    return np.flatnonzero(crossing)[:count]
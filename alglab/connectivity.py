@@ -0,0 +1,125 @@
+"""
+Connectivity queries on threshold graphs, i.e. the graphs of the first k+1
+edges of an EdgeIndex, answered from the sorted edge arrays without
+building networkx graphs.
+"""
+from typing import List
+
+import numpy as np
+
+
+class UnionFind:
+    """
+    Disjoint-set forest over the integers 0..n-1, stored in a flat list.
+    root() uses iterative path halving, so there is no recursion limit to hit.
+    """
+
+    def __init__(self, n: int):
+        self.parent: List[int] = list(range(n))
+        self.components = n
+
+    def root(self, v: int) -> int:
+        parent = self.parent
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    def union(self, v: int, w: int) -> bool:
+        """
+        Merge the components of v and w. Returns False if they already were the same.
+        """
+        rv, rw = self.root(v), self.root(w)
+        if rv == rw:
+            return False
+        self.parent[rw] = rv
+        self.components -= 1
+        return True
+
+
+class ThresholdConnectivity:
+    """
+    Oracle for the threshold graphs of an EdgeIndex. A single Kruskal pass over
+    the sorted edges records the index at which the graph becomes connected,
+    after which 'is prefix k connected?' is a comparison. The incident edge
+    indices of every vertex are grouped into ascending CSR arrays, so prefix
+    degrees are binary searches.
+    """
+
+    def __init__(self, edge_index):
+        self.edge_index = edge_index
+        self.n = edge_index.n
+        self.connected_at = self.__kruskal()
+        m = len(edge_index)
+        ends = np.concatenate((edge_index.u, edge_index.v))
+        ids = np.concatenate((np.arange(m), np.arange(m)))
+        order = np.lexsort((ids, ends))
+        # The edges incident to v are incident[ptr[v]:ptr[v+1]], ascending by length.
+        self.incident = ids[order]
+        self.ptr = np.searchsorted(ends[order], np.arange(self.n + 1))
+
+    def __kruskal(self) -> int:
+        """
+        Return the index of the edge that connects the last two components,
+        i.e. the bottleneck edge of the minimum spanning tree.
+        """
+        forest = UnionFind(self.n)
+        if forest.components <= 1:
+            return 0
+        for i, (v, w) in enumerate(zip(self.edge_index.u.tolist(), self.edge_index.v.tolist())):
+            if forest.union(v, w) and forest.components == 1:
+                return i
+        return len(self.edge_index)
+
+    def is_connected(self, k: int) -> bool:
+        """
+        Is the graph of the edges 0..k connected?
+        """
+        return k >= self.connected_at
+
+    def degree(self, v: int, k: int) -> int:
+        """
+        Return the degree of vertex v in the graph of the edges 0..k.
+        """
+        lo, hi = self.ptr[v], self.ptr[v + 1]
+        return int(np.searchsorted(self.incident[lo:hi], k, side='right'))
+
+    def degrees(self, k: int) -> np.ndarray:
+        """
+        Return the degrees of all vertices in the graph of the edges 0..k.
+        """
+        return np.bincount(np.concatenate((self.edge_index.u[:k + 1], self.edge_index.v[:k + 1])),
+                           minlength=self.n)
+
+    def min_degree_index(self, degree: int) -> int:
+        """
+        Return the smallest edge index at which every vertex has at least 'degree' incident edges.
+        """
+        if self.n <= degree:
+            return len(self.edge_index)
+        return int(self.incident[self.ptr[:-1] + degree - 1].max())
+
+
+def selected_positions(model: List[int], active: np.ndarray) -> np.ndarray:
+    """
+    Return the sorted-edge positions of all active edges that are true in a SAT
+    assignment, where the edge at position i has the variable i+1.
+    """
+    lits = np.asarray(model, dtype=np.int64)
+    positions = lits[(lits > 0) & (lits <= len(active))] - 1
+    return positions[active[positions]]
+
+
+def components_of(n: int, u: np.ndarray, v: np.ndarray) -> List[np.ndarray]:
+    """
+    Return the connected components of the graph with the vertices 0..n-1 and
+    the edges u[i]v[i], each as an array of vertex indices.
+    """
+    forest = UnionFind(n)
+    for a, b in zip(u.tolist(), v.tolist()):
+        forest.union(a, b)
+    if forest.components == 1:
+        return [np.arange(n)]
+    roots = np.array([forest.root(x) for x in range(n)])
+    order = np.argsort(roots, kind='stable')
+    return np.split(order, np.flatnonzero(np.diff(roots[order])) + 1)
@@ -0,0 +1,97 @@
+"""
+On-disk store for the connectivity clauses ('cuts') of the SAT solvers.
+A cut only says that some vertex set needs an edge to the rest of the graph,
+which holds for every threshold, so cuts learned in one run can be loaded
+into the next solver for the same points.
+"""
+import os
+from typing import List
+
+import numpy as np
+
+from .util import instance_hash
+
+
+class CutStore:
+    """
+    Keeps one file per instance in a directory, named by the instance hash of
+    the point coordinates (util.instance_hash). A file holds all cuts of the
+    instance as an (cuts x n/8) uint8 array: every row is the bit-packed vertex set of one component over the
+    points in lexicographic order, so the point order of a solver does not matter.
+    When the directory grows beyond max_bytes, the least recently used files are deleted.
+    """
+    suffix = ".cuts.npy"
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 2 ** 20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def canonical_order(edge_index) -> np.ndarray:
+        """
+        Return the point indices of an EdgeIndex, sorted lexicographically by coordinates.
+        """
+        coords = edge_index.coords
+        return np.lexsort((coords[:, 1], coords[:, 0]))
+
+    @staticmethod
+    def fingerprint(edge_index) -> str:
+        # the same key as InstanceSet and SolutionCache use for the instance
+        return instance_hash(edge_index.coords)
+
+    def path(self, edge_index) -> str:
+        return os.path.join(self.directory, self.fingerprint(edge_index) + self.suffix)
+
+    def load(self, edge_index) -> List[np.ndarray]:
+        """
+        Return the stored cuts of the instance as arrays of point indices of edge_index.
+        """
+        path = self.path(edge_index)
+        if not os.path.exists(path):
+            return []
+        os.utime(path)  # mark as recently used
+        rows = np.load(path)
+        order = self.canonical_order(edge_index)
+        masks = np.unpackbits(rows, axis=1, count=edge_index.n).astype(bool)
+        return [order[mask] for mask in masks]
+
+    def save(self, edge_index, cuts: List[np.ndarray]):
+        """
+        Merge the given cuts (arrays of point indices of edge_index) into the stored ones.
+        """
+        if not cuts:
+            return
+        rank = np.empty(edge_index.n, dtype=np.int64)
+        rank[self.canonical_order(edge_index)] = np.arange(edge_index.n)
+        masks = np.zeros((len(cuts), edge_index.n), dtype=bool)
+        for row, component in zip(masks, cuts):
+            row[rank[component]] = True
+        rows = np.packbits(masks, axis=1)
+        path = self.path(edge_index)
+        if os.path.exists(path):
+            rows = np.concatenate((np.load(path), rows))
+        rows = np.unique(rows, axis=0)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, rows)
+        os.replace(tmp, path)  # readers never see a partial file
+        self.evict(keep=path)
+
+    def evict(self, keep: str = None):
+        """
+        Delete the least recently used files until the store fits into max_bytes.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.suffix):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                os.remove(path)
+                total -= size
@@ -0,0 +1,50 @@
+"""
+Generation of the connectivity clauses ('lazy constraints') of the SAT solvers
+from a dense matrix of variable ids instead of per-edge dictionary lookups.
+"""
+from typing import List, Optional
+
+import numpy as np
+
+
+class CutGenerator:
+    """
+    Holds the n x n matrix var, where var[v, w] is the SAT variable of the edge vw
+    (position in the sorted edges + 1), or 0 if the edge has no variable.
+    The literals of all edges leaving a component are then one masked slice
+    of this matrix.
+    """
+
+    def __init__(self, edge_index, active: np.ndarray):
+        self.edge_index = edge_index
+        self.var = np.zeros((edge_index.n, edge_index.n), dtype=np.int32)
+        self.activate(np.flatnonzero(active))
+
+    def activate(self, positions: np.ndarray):
+        """
+        Give the edges at the given positions their variable.
+        """
+        u, v = self.edge_index.u[positions], self.edge_index.v[positions]
+        self.var[u, v] = positions + 1
+        self.var[v, u] = positions + 1
+
+    def incident_literals(self, v: int) -> List[int]:
+        """
+        Return the variables of all edges at vertex v.
+        """
+        row = self.var[v]
+        return row[row > 0].tolist()
+
+    def crossing_literals(self, component: np.ndarray, limit: Optional[int] = None) -> List[int]:
+        """
+        Return the variables of all edges leaving the component (given as vertex indices).
+        If a limit is given, only edges with an index <= limit are used, which keeps the
+        clause short. This is only valid as long as no edge above the limit may be selected.
+        """
+        inside = np.zeros(self.edge_index.n, dtype=bool)
+        inside[component] = True
+        block = self.var[inside][:, ~inside]
+        literals = block[block > 0]
+        if limit is not None:
+            literals = literals[literals <= limit + 1]
+        return literals.tolist()
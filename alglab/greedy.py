@@ -0,0 +1,61 @@
+"""
+Greedy BTSP tour similar to Kruskal's algorithm, the start solution of the sheets
+(Greedy_Btsp of 03_card_sat/BTSP and 04_mip/MIP, which only differ in what solve returns).
+"""
+from typing import List, Optional
+
+import numpy as np
+
+from .util import EdgeIndex, Edge, node_list
+from .heuristic import neighbour_lists, greedy_edges
+from .candidates import solution_positions
+
+
+class GreedyTour:
+    """
+    Take the shortest edges that keep every point at degree <= 2 and close no cycle,
+    until they form a Hamiltonian path, and close it to a tour (see greedy_edges). The
+    edges are first taken from the k nearest neighbours of every point, and only the
+    points that are left with degree < 2 are then connected with all their edges, so
+    the O(n^2) edge list is never built.
+    """
+
+    def __init__(self, points, k: int = 10):
+        self.points = points  # (x,y)-tuples or an (n, 2) coordinate array
+        self.nodes = node_list(points)
+        self.coords = np.array(self.nodes, dtype=np.int64).reshape(-1, 2)
+        self.k = k
+        self._all_edges: Optional[EdgeIndex] = None
+        self.edges: List[Edge] = []  # the tour after solve_edges()
+
+    @property
+    def all_edges(self) -> EdgeIndex:
+        """
+        All edges sorted by length, only built when needed (for the start vector).
+        """
+        if self._all_edges is None:
+            self._all_edges = EdgeIndex(self.coords)
+        return self._all_edges
+
+    def solve_edges(self) -> List[Edge]:
+        """
+        Return the greedy tour as list of edges.
+        """
+        n = len(self.nodes)
+        if n < 3:
+            raise ValueError("A tour needs at least three points!")
+        path = greedy_edges(self.coords, neighbour_lists(self.coords, self.k), complete=True)
+        degree = np.bincount(np.array(path).ravel(), minlength=n)
+        ends = np.flatnonzero(degree < 2)
+        path.append((int(ends[0]), int(ends[1])))
+        self.edges = [(self.nodes[v], self.nodes[w]) for v, w in path]
+        return self.edges
+
+    def start_vector(self, edge_index: EdgeIndex = None) -> List[int]:
+        """
+        Return the tour as 0/1 list over the sorted edges of edge_index (self.all_edges by default).
+        """
+        edge_index = edge_index if edge_index is not None else self.all_edges
+        vector = np.zeros(len(edge_index), dtype=np.int8)
+        vector[solution_positions(edge_index, self.edges)] = 1
+        return vector.tolist()
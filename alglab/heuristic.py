@@ -0,0 +1,250 @@
+"""
+Heuristic BTSP tours as warm starts (upper bounds) for the exact solvers.
+A tour is built greedily from the edges to the k nearest neighbours of every
+point: short edges are taken as long as they keep every point at degree <= 2
+and close no cycle, and the resulting paths are chained into one tour. Then a
+local search removes the bottleneck edge again and again with 2-opt and Or-opt
+moves, which only add edges shorter than the current bottleneck. Tours are
+arrays of point indices, all distances are compared squared (exact integers).
+"""
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .connectivity import UnionFind
+
+Node = Tuple[int, int]
+Edge = Tuple[Node, Node]
+
+
+def neighbour_lists(coords: np.ndarray, k: int) -> np.ndarray:
+    """
+    Return an (n, k) array with the indices of the k nearest neighbours of every point, nearest first.
+    Uses a k-d tree from scipy if it is installed, otherwise blocks of the distance matrix.
+    """
+    n = len(coords)
+    k = min(k, n - 1)
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        pass
+    else:
+        # the points are distinct, so every point is its own nearest neighbour
+        _, nearest = cKDTree(coords).query(coords, k + 1)
+        return nearest[:, 1:].astype(np.int64).reshape(n, k)
+    neighbours = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, 1024):  # blocks of rows, the full matrix can be too large
+        delta = coords[start:start + 1024, None, :] - coords[None, :, :]
+        d2 = np.einsum('ijk,ijk->ij', delta, delta)
+        d2[np.arange(len(d2)), np.arange(start, start + len(d2))] = np.iinfo(np.int64).max
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(d2, nearest, axis=1), axis=1, kind='stable')
+        neighbours[start:start + len(d2)] = np.take_along_axis(nearest, order, axis=1)
+    return neighbours
+
+
+def squared_lengths(coords: np.ndarray, tour: np.ndarray) -> np.ndarray:
+    """
+    Squared length of the edge from tour[i] to tour[i+1] (cyclic), for every i.
+    """
+    delta = coords[tour] - coords[np.roll(tour, -1)]
+    return np.einsum('ij,ij->i', delta, delta)
+
+
+def _pairs_by_length(coords: np.ndarray, u: np.ndarray, v: np.ndarray):
+    delta = coords[u] - coords[v]
+    order = np.argsort(np.einsum('ij,ij->i', delta, delta), kind='stable')
+    return zip(u[order].tolist(), v[order].tolist())
+
+
+def greedy_edges(coords: np.ndarray, neighbours: np.ndarray, complete: bool = False) -> List[Tuple[int, int]]:
+    """
+    Greedy path cover, shortest edge first: take the neighbour edges that keep every point
+    at degree <= 2 and close no cycle. With complete, the points left with degree < 2 are
+    then connected with all edges between them, which gives a Hamiltonian path.
+    Returns the edges as pairs of point indices.
+    """
+    n = len(coords)
+    components = UnionFind(n)
+    degree = [0] * n
+    edges: List[Tuple[int, int]] = []
+
+    def scan(pairs):
+        for a, b in pairs:
+            if degree[a] < 2 and degree[b] < 2 and components.union(a, b):
+                degree[a] += 1
+                degree[b] += 1
+                edges.append((a, b))
+                if len(edges) == n - 1:
+                    return
+
+    u = np.repeat(np.arange(n), neighbours.shape[1])
+    v = neighbours.ravel()
+    keep = u < v  # every edge once
+    scan(_pairs_by_length(coords, u[keep], v[keep]))
+    if complete and len(edges) < n - 1:
+        # Connect the remaining path ends with all edges between them.
+        free = np.flatnonzero(np.array(degree) < 2)
+        i, j = np.triu_indices(len(free), k=1)
+        scan(_pairs_by_length(coords, free[i], free[j]))
+    return edges
+
+
+def greedy_tour(coords: np.ndarray, neighbours: np.ndarray) -> np.ndarray:
+    """
+    Greedy path cover on the neighbour edges (see greedy_edges), with the paths
+    then chained into a tour: every path is appended at the free end nearest to the
+    end of the tour so far.
+    """
+    n = len(coords)
+    if n <= 3:
+        return np.arange(n)
+    degree = [0] * n
+    adjacent: List[List[int]] = [[] for _ in range(n)]
+    for a, b in greedy_edges(coords, neighbours):
+        degree[a] += 1
+        degree[b] += 1
+        adjacent[a].append(b)
+        adjacent[b].append(a)
+
+    # Walk every path from one of its ends (a single point is a path, too).
+    paths, visited = [], [False] * n
+    for start in range(n):
+        if visited[start] or degree[start] == 2:
+            continue
+        path, previous, current = [], -1, start
+        while current != -1:
+            visited[current] = True
+            path.append(current)
+            following = [w for w in adjacent[current] if w != previous]
+            previous, current = current, (following[0] if following else -1)
+        paths.append(path)
+
+    # Chain the paths, nearest free end first.
+    tour = list(paths[0])
+    remaining = paths[1:]
+    while remaining:
+        ends = np.array([[p[0], p[-1]] for p in remaining])
+        delta = coords[ends] - coords[tour[-1]]
+        d2 = np.einsum('ijk,ijk->ij', delta, delta)
+        i, side = np.unravel_index(np.argmin(d2), d2.shape)
+        path = remaining.pop(int(i))
+        tour.extend(path if side == 0 else reversed(path))
+    return np.array(tour, dtype=np.int64)
+
+
+def _d2(coords: np.ndarray, a: int, b: int) -> int:
+    dx, dy = coords[a] - coords[b]
+    return int(dx * dx + dy * dy)
+
+
+def _remove_first_edge(coords: np.ndarray, tour: np.ndarray, neighbours: np.ndarray,
+                       bottleneck: int, max_segment: int) -> Optional[np.ndarray]:
+    """
+    Try to replace the edge tour[0]tour[1] by edges shorter than the bottleneck (squared),
+    with a 2-opt move, by inserting a segment near tour[0] between both ends, or with an
+    Or-opt move of a segment starting at tour[1].
+    Returns the new tour or None.
+    """
+    n = len(tour)
+    a, b = int(tour[0]), int(tour[1])
+    position = np.empty(n, dtype=np.int64)
+    position[tour] = np.arange(n)
+
+    # 2-opt: a b ... c d ... -> a c ... b d ..., with c a neighbour of a or d a neighbour of b
+    for j in set((position[neighbours[a]]).tolist()) | set((position[neighbours[b]] - 1).tolist()):
+        if j < 2 or j == n - 1:
+            continue
+        c, d = int(tour[j]), int(tour[j + 1])
+        if _d2(coords, a, c) < bottleneck and _d2(coords, b, d) < bottleneck:
+            return np.concatenate((tour[:1], tour[j:0:-1], tour[j + 1:]))
+
+    # Insertion: move a segment s ... t (up to max_segment points, s a neighbour of a) between a and b.
+    for j in position[neighbours[a]].tolist():
+        for step in (1, -1):
+            for length in range(1, max_segment + 1):
+                positions = (j + step * np.arange(length)) % n
+                if (positions < 2).any():
+                    break
+                s, t = int(tour[j]), int(tour[positions[-1]])
+                p, q = int(tour[(j - step) % n]), int(tour[(positions[-1] + step) % n])
+                if (_d2(coords, a, s) < bottleneck and _d2(coords, t, b) < bottleneck
+                        and _d2(coords, p, q) < bottleneck):
+                    rest = np.delete(tour, positions)
+                    return np.concatenate((rest[:1], tour[positions], rest[1:]))
+
+    # Or-opt: move the segment b ... e (up to max_segment points) between two other neighbours c and d.
+    for length in range(1, min(max_segment, n - 3) + 1):
+        e, f = int(tour[length]), int(tour[length + 1])
+        if _d2(coords, a, f) >= bottleneck:
+            continue
+        segment = tour[1:length + 1]
+        rest = np.concatenate((tour[:1], tour[length + 1:]))  # the tour without the segment
+        rest_position = np.full(n, -1, dtype=np.int64)
+        rest_position[rest] = np.arange(len(rest))
+        for c in set(neighbours[b].tolist()) | set(neighbours[e].tolist()):
+            i = int(rest_position[c])
+            if i < 0:
+                continue  # c is in the segment
+            for x, y in ((i, (i + 1) % len(rest)), ((i - 1) % len(rest), i)):
+                if x == 0 and y == 1:
+                    continue  # the gap the segment was taken from
+                p, q = int(rest[x]), int(rest[y])
+                if _d2(coords, p, b) < bottleneck and _d2(coords, e, q) < bottleneck:
+                    inserted = segment
+                elif _d2(coords, p, e) < bottleneck and _d2(coords, b, q) < bottleneck:
+                    inserted = segment[::-1]
+                else:
+                    continue
+                return np.concatenate((rest[:x + 1], inserted, rest[x + 1:]))
+    return None
+
+
+def improve_tour(coords: np.ndarray, tour: np.ndarray, neighbours: np.ndarray, max_segment: int = 3,
+                 time_limit: Optional[float] = None) -> np.ndarray:
+    """
+    Bottleneck local search: while every edge of maximum length can be replaced by
+    shorter edges (2-opt or Or-opt with the neighbour lists), replace it.
+    """
+    n = len(tour)
+    if n <= 3:
+        return tour
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    while deadline is None or time.perf_counter() < deadline:
+        lengths = squared_lengths(coords, tour)
+        bottleneck = int(lengths.max())
+        i = int(np.argmax(lengths))
+        improved = None
+        for rotated in (np.roll(tour, -i), np.roll(tour[::-1], i + 2 - n)):
+            # both orientations of the bottleneck edge as tour[0]tour[1]
+            improved = _remove_first_edge(coords, rotated, neighbours, bottleneck, max_segment)
+            if improved is not None:
+                break
+        if improved is None:
+            return tour  # the bottleneck edge cannot be removed
+        tour = improved
+    return tour
+
+
+def heuristic_tour(points: Iterable[Node], k: int = 10, max_segment: int = 3,
+                   time_limit: Optional[float] = None) -> List[Edge]:
+    """
+    Build a tour with greedy_tour and improve its bottleneck with improve_tour.
+    :param points: The set of points as (x,y)-tuples, or an (n, 2) coordinate array.
+    :param k: Size of the neighbour lists.
+    :param max_segment: Longest segment moved by Or-opt.
+    :param time_limit: Optional limit for the local search in seconds.
+    :return: The tour as list of edges, in tour order.
+    """
+    if isinstance(points, np.ndarray):
+        coords = points.astype(np.int64).reshape(-1, 2)
+    else:
+        coords = np.array([tuple(p) for p in points], dtype=np.int64).reshape(-1, 2)
+    n = len(coords)
+    if n < 3:
+        raise ValueError("A tour needs at least three points!")
+    neighbours = neighbour_lists(coords, k)
+    tour = improve_tour(coords, greedy_tour(coords, neighbours), neighbours, max_segment, time_limit)
+    nodes = list(map(tuple, coords.tolist()))
+    return [(nodes[a], nodes[b]) for a, b in zip(tour.tolist(), np.roll(tour, -1).tolist())]
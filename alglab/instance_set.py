@@ -0,0 +1,174 @@
+"""
+Collections of instances in a directory or an archive (.zip, .tar, .tar.gz).
+The collection is indexed once (number of points, content hash and bounding box
+per instance), after which sweeps can select instances by size and load them
+lazily, one at a time.
+"""
+import json
+import os
+import tarfile
+import zipfile
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .util import INSTANCE_MAGIC, parse_points, parse_json_points, instance_hash
+
+INSTANCE_SUFFIXES = (".pts", ".json")
+
+
+class InstanceInfo(NamedTuple):
+    name: str  # file name relative to the directory, or the archive member
+    size: int  # number of points
+    hash: str  # see util.instance_hash, independent of the point order
+    bbox: Tuple[int, int, int, int]  # (min x, min y, max x, max y)
+
+
+def parse_instance(data: bytes, name: str) -> np.ndarray:
+    """
+    Parse an instance file in the binary or in one of the JSON formats as (n, 2) array.
+    """
+    if data[:len(INSTANCE_MAGIC)] == INSTANCE_MAGIC:
+        return parse_points(data, name)
+    return parse_json_points(data.decode("utf-8"), name)
+
+
+def describe(name: str, points: np.ndarray) -> InstanceInfo:
+    if len(points) == 0:
+        return InstanceInfo(name, 0, instance_hash(points), (0, 0, 0, 0))
+    low, high = points.min(axis=0), points.max(axis=0)
+    return InstanceInfo(name, len(points), instance_hash(points),
+                        (int(low[0]), int(low[1]), int(high[0]), int(high[1])))
+
+
+class InstanceSet:
+    """
+    All instance files (.pts and .json) of a directory (recursively) or an archive.
+    The index is built on first use. With an index_file, it is also saved as JSON
+    and reused on the next scan for every file whose modification time and file size
+    did not change, so only new or changed files are parsed.
+    """
+
+    def __init__(self, source: str, index_file: Optional[str] = None):
+        self.source = source
+        self.index_file = index_file
+        self._index: Optional[List[InstanceInfo]] = None
+
+    def _is_archive(self) -> bool:
+        return os.path.isfile(self.source) and (zipfile.is_zipfile(self.source) or tarfile.is_tarfile(self.source))
+
+    def _files(self) -> Iterator[Tuple[str, list, Callable[[], bytes]]]:
+        """
+        Yield (name, [modification time, file size], reader) for every instance file of the source.
+        """
+        if not self._is_archive():
+            for root, _, files in os.walk(self.source):
+                for file in sorted(files):
+                    if file.endswith(INSTANCE_SUFFIXES):
+                        path = os.path.join(root, file)
+                        stat = os.stat(path)
+                        name = os.path.relpath(path, self.source)
+                        yield name, [stat.st_mtime, stat.st_size], lambda name=name: self._read(name)
+        elif zipfile.is_zipfile(self.source):
+            with zipfile.ZipFile(self.source) as archive:
+                for member in archive.infolist():
+                    if member.filename.endswith(INSTANCE_SUFFIXES):
+                        yield (member.filename, [list(member.date_time), member.file_size],
+                               lambda member=member: archive.read(member))
+        else:
+            with tarfile.open(self.source) as archive:
+                for member in archive:
+                    if member.isfile() and member.name.endswith(INSTANCE_SUFFIXES):
+                        yield (member.name, [member.mtime, member.size],
+                               lambda member=member: archive.extractfile(member).read())
+
+    @contextmanager
+    def open(self) -> Iterator[Optional[object]]:
+        """
+        Open the archive of the source for a series of load calls (None for a directory),
+        so the archive and its member list are only read once.
+        """
+        if not self._is_archive():
+            yield None
+        elif zipfile.is_zipfile(self.source):
+            with zipfile.ZipFile(self.source) as archive:
+                yield archive
+        else:
+            with tarfile.open(self.source) as archive:
+                yield archive
+
+    def _read(self, name: str, archive=None) -> bytes:
+        if archive is None:
+            if not self._is_archive():
+                with open(os.path.join(self.source, name), "rb") as f:
+                    return f.read()
+            with self.open() as archive:
+                return self._read(name, archive)
+        if isinstance(archive, zipfile.ZipFile):
+            return archive.read(name)
+        return archive.extractfile(name).read()
+
+    def _load_cached_index(self) -> dict:
+        if self.index_file is None or not os.path.exists(self.index_file):
+            return {}
+        with open(self.index_file, "r") as f:
+            return {entry["name"]: entry for entry in json.load(f)}
+
+    def scan(self) -> List[InstanceInfo]:
+        """
+        (Re-)build the index of all instances.
+        """
+        cached = self._load_cached_index()
+        index, entries = [], []
+        for name, stamp, read in self._files():
+            entry = cached.get(name)
+            if entry is not None and entry["stamp"] == stamp:
+                info = InstanceInfo(name, entry["size"], entry["hash"], tuple(entry["bbox"]))
+            else:
+                info = describe(name, parse_instance(read(), name))
+            index.append(info)
+            entries.append(dict(info._asdict(), stamp=stamp))
+        if self.index_file is not None:
+            with open(self.index_file, "w") as f:
+                json.dump(entries, f)
+        self._index = index
+        return index
+
+    @property
+    def index(self) -> List[InstanceInfo]:
+        if self._index is None:
+            self.scan()
+        return self._index
+
+    def __len__(self):
+        return len(self.index)
+
+    def load(self, info: InstanceInfo, archive=None) -> np.ndarray:
+        """
+        Load the points of one instance as (n, 2) array.
+        :param archive: Optional parameter. The archive as returned by open, which is opened for this call otherwise.
+        """
+        return parse_instance(self._read(info.name, archive), info.name)
+
+    def select(self, min_size: int = 0, max_size: Optional[int] = None, sort: bool = True) -> List[InstanceInfo]:
+        """
+        Return the index entries with min_size <= size <= max_size, ascending by size if sort is set.
+        """
+        selected = [info for info in self.index
+                    if info.size >= min_size and (max_size is None or info.size <= max_size)]
+        if sort:
+            selected.sort(key=lambda info: (info.size, info.name))
+        return selected
+
+    def instances(self, min_size: int = 0, max_size: Optional[int] = None,
+                  sort: bool = True) -> Iterator[Tuple[InstanceInfo, np.ndarray]]:
+        """
+        Yield (info, points) for the selected instances (see select), each loaded only when it is reached.
+        """
+        with self.open() as archive:
+            for info in self.select(min_size, max_size, sort):
+                yield info, self.load(info, archive)
+
+    def __iter__(self) -> Iterator[Tuple[InstanceInfo, np.ndarray]]:
+        return self.instances()
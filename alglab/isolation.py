@@ -0,0 +1,101 @@
+"""
+Run a solve in a child process with a hard wall-clock and memory limit.
+A SIGALRM handler only works in the main thread and cannot stop native solver
+code (pysat, OR-Tools), but a child process can always be killed. The solve
+reports intermediate results (e.g. the best bottleneck so far) through a
+callable, so a killed run still returns the last one.
+"""
+import multiprocessing
+import resource
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+# status of an IsolatedResult
+OK, TIMEOUT, MEMOUT, ERROR, CRASHED = "ok", "timeout", "memout", "error", "crashed"
+
+
+class IsolatedResult(NamedTuple):
+    status: str  # one of ok, timeout, memout, error, crashed
+    value: Any  # the return value of the target, None if it did not return
+    partial: Any  # the last value passed to report, None if there was none
+    runtime: float  # wall-clock seconds
+    error: Optional[str] = None  # the traceback or exit code if the target failed
+
+
+def _child(connection, target: Callable, args: tuple, kwargs: dict, memory_limit: Optional[int]):
+    if memory_limit is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    def report(value):
+        connection.send(("report", value))
+
+    try:
+        connection.send(("done", target(report, *args, **kwargs)))
+    except MemoryError:
+        connection.send(("memout", traceback.format_exc()))
+    except BaseException:
+        connection.send(("error", traceback.format_exc()))
+    finally:
+        connection.close()
+
+
+def run_isolated(target: Callable, args: tuple = (), kwargs: Optional[dict] = None,
+                 time_limit: Optional[float] = None, memory_limit: Optional[int] = None) -> IsolatedResult:
+    """
+    Call target(report, *args, **kwargs) in a child process and wait for it at most time_limit seconds.
+    The target must be picklable (a module-level function) and may call report(value) any number
+    of times; the last value is returned as partial result, also after a timeout.
+    :param time_limit: Wall-clock limit in seconds, after which the child is killed (SIGKILL).
+    :param memory_limit: Limit of the address space of the child in bytes (RLIMIT_AS).
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_child, args=(sender, target, args, kwargs or {}, memory_limit),
+                                      daemon=True)
+    start = time.perf_counter()
+    process.start()
+    sender.close()  # the child holds the other copy, EOF once it exits
+    deadline = None if time_limit is None else start + time_limit
+    partial, status, value, error = None, None, None, None
+    try:
+        while status is None:
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                status = TIMEOUT
+                break
+            if not receiver.poll(remaining):
+                continue  # the loop checks the deadline
+            try:
+                kind, payload = receiver.recv()
+            except EOFError:
+                process.join()
+                status = MEMOUT if memory_limit is not None and process.exitcode < 0 else CRASHED
+                error = f"exit code {process.exitcode}"
+                break
+            if kind == "report":
+                partial = payload
+            elif kind == "done":
+                status, value = OK, payload
+            else:
+                status, error = (MEMOUT if kind == "memout" else ERROR), payload
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        receiver.close()
+    return IsolatedResult(status, value, partial, time.perf_counter() - start, error)
+
+
+def run_many(tasks: List[Tuple[Callable, tuple, dict]], max_workers: int = None, time_limit: Optional[float] = None,
+             memory_limit: Optional[int] = None) -> Iterator[Tuple[int, IsolatedResult]]:
+    """
+    Run the tasks (target, args, kwargs), each with run_isolated, up to max_workers at the same time.
+    Yields (task index, result) in the order the tasks finish, so a slow task does not hold back the others.
+    """
+    max_workers = max_workers or multiprocessing.cpu_count()
+    with ThreadPoolExecutor(max_workers) as pool:
+        futures = {pool.submit(run_isolated, target, args, kwargs, time_limit, memory_limit): i
+                   for i, (target, args, kwargs) in enumerate(tasks)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
@@ -0,0 +1,111 @@
+"""
+Persistent store for benchmark results, so that an interrupted benchmark can
+be resumed. A result is identified by the instance hash (util.instance_hash),
+the solver name and its parameters. Results are written to an SQLite database,
+or appended to a JSONL file if the path ends in '.jsonl'.
+"""
+import json
+import os
+import sqlite3
+import time
+from typing import List, Optional
+
+# A pair (instance, configuration) with one of these results is not run again.
+FINISHED = ("optimal", "feasible", "timeout", "infeasible")
+
+
+class ResultStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.jsonl = path.endswith(".jsonl")
+        self._finished = set()
+        if self.jsonl:
+            self.__load_jsonl()
+        else:
+            self.connection = sqlite3.connect(path)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (instance TEXT, solver TEXT, params TEXT, bottleneck REAL,"
+                " runtime REAL, solver_time REAL, status TEXT, created REAL)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS results_key ON results (instance, solver, params)")
+            self.connection.commit()
+
+    @staticmethod
+    def key(instance: str, solver: str, params: dict):
+        return instance, solver, json.dumps(params, sort_keys=True)
+
+    def __load_jsonl(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # the last line of a killed run can be incomplete
+                if row["status"] in FINISHED:
+                    self._finished.add(self.key(row["instance"], row["solver"], row["params"]))
+
+    def is_done(self, instance: str, solver: str, params: dict) -> bool:
+        """
+        Is there a finished result for the instance and configuration?
+        Changed parameters are a different configuration.
+        """
+        key = self.key(instance, solver, params)
+        if self.jsonl:
+            return key in self._finished
+        placeholders = ", ".join("?" for _ in FINISHED)
+        row = self.connection.execute(
+            f"SELECT 1 FROM results WHERE instance = ? AND solver = ? AND params = ? AND status IN ({placeholders})",
+            key + FINISHED).fetchone()
+        return row is not None
+
+    def record(self, instance: str, solver: str, params: dict, bottleneck: Optional[float], runtime: float,
+               solver_time: Optional[float], status: str):
+        """
+        Save the result of one run. It is on disk when this returns.
+        """
+        key = self.key(instance, solver, params)
+        if self.jsonl:
+            row = dict(instance=instance, solver=solver, params=params, bottleneck=bottleneck, runtime=runtime,
+                       solver_time=solver_time, status=status, created=time.time())
+            with open(self.path, "a") as f:
+                f.write(json.dumps(row) + "\n")
+            if status in FINISHED:
+                self._finished.add(key)
+        else:
+            self.connection.execute("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                    key + (bottleneck, runtime, solver_time, status, time.time()))
+            self.connection.commit()
+
+    def results(self, solver: Optional[str] = None) -> List[dict]:
+        """
+        Return all results (of one solver), oldest first.
+        """
+        if self.jsonl:
+            rows = []
+            if os.path.exists(self.path):
+                with open(self.path, "r") as f:
+                    for line in f:
+                        try:
+                            rows.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            continue
+            return [row for row in rows if solver is None or row["solver"] == solver]
+        cursor = self.connection.execute(
+            "SELECT * FROM results" + (" WHERE solver = ?" if solver is not None else "") + " ORDER BY created",
+            (solver,) if solver is not None else ())
+        names = [column[0] for column in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor]
+        for row in rows:
+            row["params"] = json.loads(row["params"])
+        return rows
+
+    def result(self, instance: str, solver: str, params: dict) -> Optional[dict]:
+        """
+        Return the latest finished result for the instance and configuration, or None.
+        """
+        key = self.key(instance, solver, params)
+        for row in reversed(self.results(solver)):
+            if self.key(row["instance"], row["solver"], row["params"]) == key and row["status"] in FINISHED:
+                return row
+        return None
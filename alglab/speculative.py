@@ -0,0 +1,106 @@
+"""
+Speculative k-ary search for the bottleneck: every round probes k thresholds
+at once, each in a worker process with its own solver instance, which shrinks
+the search interval by a factor of k+1 per round instead of 2.
+The components that a worker cuts off do not depend on the threshold, so
+they are passed on to all other workers in the next round.
+Works with every solver that has the probe interface of BTSPSolverSAT and
+DBSTSolverSAT (probe, add_cuts, cuts, best_solution, edge_index and stats).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .util import Node, Edge, EdgeIndex, suppress_stdout, as_node_set
+from .bounds import lower_bound_index
+from .candidates import solution_positions
+from .connectivity import ThresholdConnectivity
+
+# The solver instance of the worker process, created by _init_worker.
+_worker: Dict = {}
+
+
+def _init_worker(solver_class: type, points: List[Node], degree: int, solver_kwargs: dict):
+    with suppress_stdout():
+        _worker['solver'] = solver_class(points, degree, **solver_kwargs)
+    _worker['known'] = set()  # the cuts this solver already has
+
+
+def _probe(threshold: int, ub: int, cuts: List[np.ndarray]) -> Tuple[int, Optional[int], Optional[List[Edge]], list, float]:
+    """
+    Add the cuts of the other workers and probe one threshold. Cuts are passed
+    as point coordinates, as the point order can differ between the processes.
+    Return the threshold, the found bottleneck index and solution, the new cuts and the SAT time.
+    """
+    solver = _worker['solver']
+    known = _worker['known']
+    index_of = solver.edge_index.index_of
+    new = []
+    for cut in cuts:
+        key = cut.tobytes()
+        if key not in known:
+            known.add(key)
+            new.append(np.array([index_of[p] for p in map(tuple, cut.tolist())]))
+    solver.add_cuts(new)
+    found = len(solver.cuts)
+    sat_time = solver.stats['sat_time']
+    with suppress_stdout():
+        actual_index = solver.probe(threshold, ub)
+    own = []
+    for component in solver.cuts[found:]:
+        cut = solver.edge_index.coords[np.sort(component)]
+        known.add(cut.tobytes())
+        own.append(cut)
+    solution = solver.best_solution if actual_index is not None else None
+    return threshold, actual_index, solution, own, solver.stats['sat_time'] - sat_time
+
+
+def _thresholds(lb: int, ub: int, k: int) -> List[int]:
+    """
+    Split the open interval (lb, ub) into k+1 parts of equal size.
+    """
+    return sorted({lb + (ub - lb) * i // (k + 1) for i in range(1, k + 1)} - {lb, ub})
+
+
+def speculative_search(solver_class: type, points: Iterable[Node], degree: int, tour: bool = True,
+                       k: Optional[int] = None, solution: List[Edge] = None, **solver_kwargs):
+    """
+    Search for the shortest bottleneck edge with k probes per round.
+    :param solver_class: The solver of the workers, e.g. BTSPSolverSAT or DBSTSolverSAT.
+    :param points: The set of points as (x,y)-tuples, or an (n, 2) coordinate array.
+    :param degree: The maximum degree of a node.
+    :param tour: True if the solver searches a tour (BTSP), False for a spanning tree (DBST).
+    :param k: The number of worker processes and probes per round, the number of CPUs by default.
+    :param solution: Optional parameter. Either 'None' or a valid starting solution (as list of edges).
+    :param solver_kwargs: Further arguments for the solver, e.g. candidates='knn'.
+    :return: The best solution and the SAT time summed over all workers.
+    """
+    if not isinstance(points, np.ndarray):
+        points = sorted(as_node_set(points))  # the same point order in every worker
+    k = k or os.cpu_count() or 1
+    edge_index = EdgeIndex(points)
+    lb, ub = lower_bound_index(ThresholdConnectivity(edge_index), tour=tour) - 1, len(edge_index) - 1
+    best_solution = solution
+    if solution is not None:
+        ub = int(solution_positions(edge_index, solution).max())
+    cuts: List[np.ndarray] = []
+    sat_time = 0.0
+    with ProcessPoolExecutor(k, initializer=_init_worker,
+                             initargs=(solver_class, points, degree, solver_kwargs)) as pool:
+        while lb < ub - 1 or best_solution is None:
+            # Without any solution, the bounds can meet at the trivial upper bound, which is probed last.
+            thresholds = _thresholds(lb, ub, k) if lb < ub - 1 else [ub]
+            results = list(pool.map(_probe, thresholds, [ub] * len(thresholds), [cuts] * len(thresholds)))
+            for threshold, actual_index, found, own, probe_time in results:
+                cuts.extend(own)
+                sat_time += probe_time
+                if actual_index is None:
+                    lb = max(lb, threshold)
+                elif best_solution is None or actual_index < ub:
+                    ub, best_solution = actual_index, found
+            print(f"Bottleneck index between {lb} and {ub}, {len(cuts)} cuts")
+            if lb >= ub:
+                break  # not even the trivial upper bound is feasible
+    return best_solution, sat_time
@@ -0,0 +1,224 @@
+"""
+Helpers shared by the solvers of all sheets.
+"""
+import hashlib
+import math
+import os
+import pickle
+import struct
+import sys
+from collections.abc import Sequence
+from contextlib import contextmanager
+from json import loads
+from typing import Iterable, Iterator, List, Set, Tuple
+
+import numpy as np
+
+Node = Tuple[int, int]
+Edge = Tuple[Node, Node]
+
+
+class EdgeIndex(Sequence):
+    """
+    All edges of the complete graph on a point set, sorted ascending by length.
+    The points are held as an int64 coordinate array and the edges as the
+    parallel arrays (u, v, d2) of point indices and squared distances, so the
+    sorting is done by a single broadcast and argsort instead of a Python key
+    call per edge. Indexing, slicing and iterating yield (Node, Node) tuples,
+    which makes an EdgeIndex a drop-in replacement for the list returned by
+    all_edges_sorted.
+    """
+
+    def __init__(self, points: Iterable[Node]):
+        if isinstance(points, np.ndarray):
+            # an (n, 2) coordinate array, e.g. from read_points
+            self.coords = points.astype(np.int64).reshape(-1, 2)
+            self.nodes: List[Node] = list(map(tuple, self.coords.tolist()))
+        else:
+            self.nodes: List[Node] = [tuple(p) for p in points]
+            self.coords = np.array(self.nodes, dtype=np.int64).reshape(len(self.nodes), 2)
+        self.n = len(self.nodes)
+        self.index_of = {p: i for i, p in enumerate(self.nodes)}
+        # np.triu_indices enumerates the pairs in the same order as itertools.combinations,
+        # and a stable argsort keeps that order for edges of equal length.
+        u, v = np.triu_indices(self.n, k=1)
+        delta = self.coords[u] - self.coords[v]
+        d2 = np.einsum('ij,ij->i', delta, delta)
+        order = np.argsort(d2, kind='stable')
+        self.u = u[order].astype(np.int32)
+        self.v = v[order].astype(np.int32)
+        self.d2 = d2[order]
+
+    def __len__(self):
+        return len(self.d2)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            nodes = self.nodes
+            return [(nodes[a], nodes[b]) for a, b in zip(self.u[i].tolist(), self.v[i].tolist())]
+        if i < 0:
+            i += len(self)
+        return self.edge(i)
+
+    def __iter__(self) -> Iterator[Edge]:
+        nodes = self.nodes
+        for a, b in zip(self.u.tolist(), self.v.tolist()):
+            yield nodes[a], nodes[b]
+
+    def __reversed__(self) -> Iterator[Edge]:
+        nodes = self.nodes
+        for a, b in zip(reversed(self.u.tolist()), reversed(self.v.tolist())):
+            yield nodes[a], nodes[b]
+
+    def edge(self, i: int) -> Edge:
+        """
+        Return the i-th shortest edge as a pair of points.
+        """
+        return self.nodes[self.u[i]], self.nodes[self.v[i]]
+
+    def length(self, i: int) -> float:
+        """
+        Return the euclidian length of the i-th shortest edge.
+        """
+        return math.sqrt(self.d2[i])
+
+    def as_tuples(self) -> List[Edge]:
+        """
+        Return all edges as a list of (Node, Node) tuples in ascending order.
+        """
+        return list(self)
+
+
+def as_python_object(dct):
+    if '_python_object' in dct:
+        return pickle.loads(dct['_python_object'].encode('latin-1'))
+    return dct
+
+
+# Binary instance format: a 16 byte header (magic, format version, reserved flags,
+# number of points), followed by the coordinates as little-endian int32 (x0, y0, x1, y1, ...).
+INSTANCE_MAGIC = b"ALGPTS\0\0"
+INSTANCE_VERSION = 1
+INSTANCE_HEADER = struct.Struct("<8sHHI")
+
+
+def write_points(path, points):
+    """
+    Write points (an iterable of (x,y)-tuples or an (n, 2) array) in the binary instance format.
+    Sets are written in sorted order, so equal instances give equal files.
+    """
+    if isinstance(points, (set, frozenset)):
+        points = sorted(points)
+    coords = np.asarray(list(points) if not isinstance(points, np.ndarray) else points, dtype=np.int64).reshape(-1, 2)
+    if coords.size and (coords.min() < np.iinfo(np.int32).min or coords.max() > np.iinfo(np.int32).max):
+        raise ValueError("Coordinates do not fit into int32!")
+    with open(path, "wb") as f:
+        f.write(INSTANCE_HEADER.pack(INSTANCE_MAGIC, INSTANCE_VERSION, 0, len(coords)))
+        f.write(coords.astype("<i4").tobytes())
+
+
+def read_points(path) -> np.ndarray:
+    """
+    Read a binary instance as (n, 2) int32 array. The array is memory-mapped,
+    the coordinates are only read from disk when they are accessed.
+    """
+    with open(path, "rb") as f:
+        header = f.read(INSTANCE_HEADER.size)
+    if len(header) < INSTANCE_HEADER.size:
+        raise ValueError(f"'{path}' is too short for an instance file!")
+    magic, version, _, n = INSTANCE_HEADER.unpack(header)
+    if magic != INSTANCE_MAGIC:
+        raise ValueError(f"'{path}' is not a binary instance file!")
+    if version != INSTANCE_VERSION:
+        raise ValueError(f"'{path}' has the unsupported format version {version}!")
+    if os.path.getsize(path) != INSTANCE_HEADER.size + 8 * n:
+        raise ValueError(f"'{path}' is truncated!")
+    if n == 0:
+        return np.zeros((0, 2), dtype=np.int32)
+    return np.memmap(path, dtype="<i4", mode="r", offset=INSTANCE_HEADER.size, shape=(n, 2))
+
+
+def parse_points(data: bytes, name: str = "<bytes>") -> np.ndarray:
+    """
+    Parse a binary instance from memory (e.g. an archive member) as (n, 2) int32 array, without copying.
+    """
+    if len(data) < INSTANCE_HEADER.size:
+        raise ValueError(f"'{name}' is too short for an instance file!")
+    magic, version, _, n = INSTANCE_HEADER.unpack_from(data)
+    if magic != INSTANCE_MAGIC:
+        raise ValueError(f"'{name}' is not a binary instance file!")
+    if version != INSTANCE_VERSION:
+        raise ValueError(f"'{name}' has the unsupported format version {version}!")
+    if len(data) != INSTANCE_HEADER.size + 8 * n:
+        raise ValueError(f"'{name}' is truncated!")
+    return np.frombuffer(data, dtype="<i4", offset=INSTANCE_HEADER.size).reshape(n, 2)
+
+
+def parse_json_points(text: str, name: str = "<text>") -> np.ndarray:
+    """
+    Parse an instance in one of the JSON formats as (n, 2) array: either the old
+    pickle-in-JSON format of export_instance (only for trusted files, as it unpickles)
+    or the 'alg-tp-points' format with a list of [x, y] pairs.
+    """
+    data = loads(text, object_hook=as_python_object)
+    if isinstance(data, dict):
+        if data.get("format") != "alg-tp-points":
+            raise ValueError(f"'{name}' has the unknown instance format {data.get('format')}!")
+        data = data["points"]
+    elif isinstance(data, (set, frozenset)):
+        data = sorted(data)
+    return np.array(list(data), dtype=np.int64).reshape(-1, 2)
+
+
+def read_json_points(path) -> np.ndarray:
+    """
+    Read an instance in one of the JSON formats, see parse_json_points.
+    """
+    with open(path, "r") as f:
+        return parse_json_points(f.read(), path)
+
+
+def instance_hash(points) -> str:
+    """
+    Content hash of an instance, independent of the order of the points
+    (the SHA-1 of the lexicographically sorted int64 coordinates).
+    """
+    coords = np.asarray(points if isinstance(points, np.ndarray) else list(points), dtype=np.int64).reshape(-1, 2)
+    coords = np.ascontiguousarray(coords[np.lexsort((coords[:, 1], coords[:, 0]))])
+    return hashlib.sha1(coords.tobytes()).hexdigest()
+
+
+def convert_instance(src, dst):
+    """
+    Convert a JSON instance (see read_json_points) into the binary format.
+    """
+    write_points(dst, read_json_points(src))
+
+
+def node_list(points: Iterable[Node]) -> List[Node]:
+    """
+    Return the points as list of (x,y)-tuples in their order, also for an (n, 2) coordinate array.
+    """
+    if isinstance(points, np.ndarray):
+        return list(map(tuple, points.tolist()))
+    return [tuple(p) for p in points]
+
+
+def as_node_set(points: Iterable[Node]) -> Set[Node]:
+    """
+    Return the points as set of (x,y)-tuples, also for an (n, 2) coordinate array.
+    """
+    if isinstance(points, np.ndarray):
+        return set(map(tuple, points.tolist()))
+    return set(points)
+
+
+@contextmanager
+def suppress_stdout():
+    with open(os.devnull, "w") as devnull:
+        old_stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            yield
+        finally:
+            sys.stdout = old_stdout
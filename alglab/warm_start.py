@@ -0,0 +1,103 @@
+"""
+Warm starts for the exact solvers: a good tour gives the SAT searches their
+upper bound and initial phases (BTSPSolverSAT.warm_start), the CP-SAT models
+their hints (BTSPSolverCP.warm_start) and Gurobi its MIP start
+(BTSPSolverIP.warm_start). The tour comes from the heuristic, or from a
+SolutionCache of earlier runs on the same points if that one is better.
+"""
+import json
+import math
+import os
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from .util import Node, Edge, instance_hash
+from .heuristic import heuristic_tour
+
+
+def bottleneck_of(solution: List[Edge]) -> float:
+    return max(math.dist(*e) for e in solution)
+
+
+def tour_successors(points: Sequence[Node], solution: List[Edge]) -> Dict[int, int]:
+    """
+    Orient a tour (list of edges) and return the successor of every point index, starting at point 0.
+    """
+    index_of = {p: i for i, p in enumerate(points)}
+    neighbours = {v: [] for v in range(len(points))}
+    for p, q in solution:
+        neighbours[index_of[p]].append(index_of[q])
+        neighbours[index_of[q]].append(index_of[p])
+    successor, previous, current = {}, neighbours[0][1], 0
+    for _ in range(len(points)):
+        following = neighbours[current][0] if neighbours[current][0] != previous else neighbours[current][1]
+        successor[current] = following
+        previous, current = current, following
+    return successor
+
+
+def hint_tour(model, edge_vars: dict, successor: Dict[int, int], depth_vars: Optional[dict] = None):
+    """
+    Replace the hints of a CP-SAT model by an oriented tour (see tour_successors): the arc
+    variables edge_vars[v, w] along the tour, and the depths of the points along the tour,
+    starting at point 0, if the model has depth variables.
+    """
+    model.ClearHints()
+    for (v, w), x_vw in edge_vars.items():
+        model.AddHint(x_vw, successor[v] == w)
+    if depth_vars is not None:
+        v = 0
+        for depth in range(len(successor)):
+            model.AddHint(depth_vars[v], depth)
+            v = successor[v]
+
+
+class SolutionCache:
+    """
+    The best known tour per instance, as JSON files in a directory, named by util.instance_hash.
+    """
+    suffix = ".tour.json"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, points: Iterable[Node]) -> str:
+        return os.path.join(self.directory, instance_hash(points) + self.suffix)
+
+    def load(self, points: Iterable[Node]) -> Optional[List[Edge]]:
+        path = self.path(points)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return [(tuple(v), tuple(w)) for v, w in json.load(f)]
+
+    def save(self, points: Iterable[Node], solution: List[Edge]):
+        """
+        Store the tour, unless the stored one has a smaller bottleneck.
+        """
+        stored = self.load(points)
+        if stored is not None and bottleneck_of(stored) <= bottleneck_of(solution):
+            return
+        path = self.path(points)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump([[list(v), list(w)] for v, w in solution], f)
+        os.replace(tmp, path)
+
+
+def warm_start_tour(points: Iterable[Node], cache: Optional[SolutionCache] = None, k: int = 10,
+                    time_limit: Optional[float] = None) -> List[Edge]:
+    """
+    Return the better of the heuristic tour and the cached tour of the points.
+    :param cache: Optional SolutionCache, which then also gets the heuristic tour if it is better.
+    :param k: Size of the neighbour lists of the heuristic.
+    :param time_limit: Optional limit for the local search of the heuristic in seconds.
+    """
+    points = list(points)
+    tour = heuristic_tour(points, k, time_limit=time_limit)
+    if cache is not None:
+        cached = cache.load(points)
+        if cached is not None and bottleneck_of(cached) <= bottleneck_of(tour):
+            return cached
+        cache.save(points, tour)
+    return tour
@@ -0,0 +1,335 @@
+"""
+One benchmark harness for all solver families of the course sheets:
+
+    sat         03_card_sat/BTSP      BTSPSolverSAT (binary search)
+    dbst        03_card_sat/DBST      DBSTSolverSAT
+    cp_depth    02_cpsat/_solver.py   BTSPSolverCP with depth variables
+    cp_circuit  02_cpsat/_solver_add_circuit.py   BTSPSolverCP with AddCircuit
+    ip          04_mip/MIP            BTSPSolverIP (Gurobi)
+    ip_threshold  04_mip/MIP          BTSPSolverIP with threshold search (feasibility probes)
+    greedy      04_mip/MIP            Greedy_Btsp
+    heuristic   alglab                heuristic_tour (greedy tour and bottleneck local search)
+
+All solvers run on the same instances: random instances with fixed seeds, or
+the files of an instance directory/archive. For every run the time of the
+phases edges, build, bounds, solve, cuts and extract is reported (as far as
+the solver has the phase), and the rows are written as JSONL or CSV.
+
+    python -m bench.harness --sizes 10 20 40 --seeds 0 1 2 --out results.jsonl
+    python -m bench.harness --sizes 50 100 --time-limit 60 --memory-limit 4096 --jobs 4
+"""
+import argparse
+import contextlib
+import csv
+import importlib.util
+import json
+import math
+import os
+import random
+import sys
+import time
+import traceback
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The sheets import their own modules by plain names ('util', 'solver', 'MIP', 'dbst_sat').
+for _path in ("03_card_sat/BTSP", "03_card_sat/DBST", "04_mip"):
+    if os.path.join(ROOT, _path) not in sys.path:
+        sys.path.insert(0, os.path.join(ROOT, _path))
+# The modules shared by the sheets are in the package 'alglab'.
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+PHASES = ("edges", "build", "bounds", "solve", "cuts", "extract")
+
+Node = Tuple[int, int]
+Edge = Tuple[Node, Node]
+
+
+def _load_file(name: str, path: str):
+    """
+    Import a module by file name, for the sheets whose modules share names (02_cpsat).
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_sat(points: List[Node], degree: int = 2, solution: Optional[List[Edge]] = None,
+            **kwargs) -> Tuple[List[Edge], Dict[str, float]]:
+    from solver import BTSPSolverSAT
+    solver = BTSPSolverSAT(points, degree, solution=solution, **kwargs)
+    solution, _ = solver.solve(0)
+    stats = solver.stats
+    return solution, {'edges': stats['edges_time'], 'build': stats['build_time'], 'bounds': stats['bounds_time'],
+                      'solve': stats['sat_time'], 'cuts': stats['python_time'] - stats['extract_time'],
+                      'extract': stats['extract_time']}
+
+
+def run_dbst(points: List[Node], degree: int = 3, **kwargs) -> Tuple[List[Edge], Dict[str, float]]:
+    from dbst_sat import DBSTSolverSAT
+    solver = DBSTSolverSAT(points, degree, **kwargs)
+    solution = solver.solve()
+    stats = solver.stats
+    return solution, {'edges': stats['edges_time'], 'build': stats['build_time'], 'bounds': stats['bounds_time'],
+                      'solve': stats['sat_time'], 'cuts': stats['python_time'] - stats['extract_time'],
+                      'extract': stats['extract_time']}
+
+
+def _run_cp(module_name: str, path: str, points: List[Node],
+            solution: Optional[List[Edge]] = None) -> Tuple[List[Edge], Dict[str, float]]:
+    # arcs above the bottleneck of the warm start tour are left out of the model
+    upper_bound = max(math.dist(*e) for e in solution) if solution is not None else None
+    solver = _load_file(module_name, path).BTSPSolverCP(list(points), upper_bound)
+    if solution is not None:
+        start = time.perf_counter()
+        solver.warm_start(solution)
+        solver.stats['build_time'] += time.perf_counter() - start
+    solution = solver.solve()
+    stats = solver.stats
+    return solution, {'edges': stats['edges_time'], 'build': stats['build_time'],
+                      'solve': stats['solve_time'], 'extract': stats['extract_time']}
+
+
+def run_cp_depth(points: List[Node], solution: Optional[List[Edge]] = None) -> Tuple[List[Edge], Dict[str, float]]:
+    return _run_cp("cpsat_depth", "02_cpsat/_solver.py", points, solution)
+
+
+def run_cp_circuit(points: List[Node], solution: Optional[List[Edge]] = None) -> Tuple[List[Edge], Dict[str, float]]:
+    return _run_cp("cpsat_circuit", "02_cpsat/_solver_add_circuit.py", points, solution)
+
+
+def run_ip(points: List[Node], solution: Optional[List[Edge]] = None,
+           threshold_search: bool = False) -> Tuple[List[Edge], Dict[str, float]]:
+    from MIP import util as mip_util
+    from MIP.solver import BTSPSolverIP
+    start = time.perf_counter()
+    edges = mip_util.EdgeIndex(set(points))
+    edges_time = time.perf_counter() - start
+    solver = BTSPSolverIP(set(points), edges)
+    if solution is not None:
+        solver.warm_start(solution)
+    solution, runtime = solver.solve(threshold_search=threshold_search)
+    stats = solver.stats
+    return solution, {'edges': edges_time + stats['edges_time'], 'build': stats['build_time'],
+                      'solve': runtime - stats['cut_time'], 'cuts': stats['cut_time'],
+                      'extract': stats['extract_time']}
+
+
+def run_ip_threshold(points: List[Node], solution: Optional[List[Edge]] = None) -> Tuple[List[Edge], Dict[str, float]]:
+    return run_ip(points, solution, threshold_search=True)
+
+
+def run_greedy(points: List[Node]) -> Tuple[List[Edge], Dict[str, float]]:
+    from MIP.greedy import Greedy_Btsp
+    start = time.perf_counter()
+    greedy = Greedy_Btsp(set(points))
+    edges_time = time.perf_counter() - start
+    start = time.perf_counter()
+    solution = greedy.solve_edges()
+    return solution, {'edges': edges_time, 'solve': time.perf_counter() - start}
+
+
+def run_heuristic(points: List[Node], k: int = 10, max_segment: int = 3,
+                  time_limit: Optional[float] = None) -> Tuple[List[Edge], Dict[str, float]]:
+    from alglab.heuristic import neighbour_lists, greedy_tour, improve_tour
+    import numpy as np
+    start = time.perf_counter()
+    coords = np.array(points, dtype=np.int64)
+    neighbours = neighbour_lists(coords, k)
+    edges_time = time.perf_counter() - start
+    start = time.perf_counter()
+    tour = greedy_tour(coords, neighbours)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    tour = improve_tour(coords, tour, neighbours, max_segment, time_limit)
+    solve_time = time.perf_counter() - start
+    start = time.perf_counter()
+    solution = [(points[a], points[b]) for a, b in zip(tour.tolist(), np.roll(tour, -1).tolist())]
+    return solution, {'edges': edges_time, 'build': build_time, 'solve': solve_time,
+                      'extract': time.perf_counter() - start}
+
+
+SOLVERS: Dict[str, Callable[..., Tuple[List[Edge], Dict[str, float]]]] = {
+    'sat': run_sat,
+    'dbst': run_dbst,
+    'cp_depth': run_cp_depth,
+    'cp_circuit': run_cp_circuit,
+    'ip': run_ip,
+    'ip_threshold': run_ip_threshold,
+    'greedy': run_greedy,
+    'heuristic': run_heuristic,
+}
+
+
+# The solvers with a warm start (a 'solution' argument), see --warm-start.
+WARM_STARTS = ('sat', 'cp_depth', 'cp_circuit', 'ip', 'ip_threshold')
+
+
+def seeded_points(n: int, seed: int, w: int = 10_000, h: int = 10_000) -> List[Node]:
+    """
+    n distinct random points, the same for every run with the same seed.
+    """
+    rng = random.Random(f"{seed}/{n}")
+    points = set()
+    while len(points) < n:
+        points.add((rng.randint(0, w), rng.randint(0, h)))
+    return sorted(points)
+
+
+def random_instances(sizes: List[int], seeds: List[int]) -> Iterator[Tuple[str, List[Node]]]:
+    for n in sizes:
+        for seed in seeds:
+            yield f"random-{n}-{seed}", seeded_points(n, seed)
+
+
+def file_instances(source: str, min_size: int = 0, max_size: Optional[int] = None) -> Iterator[Tuple[str, List[Node]]]:
+    from alglab.instance_set import InstanceSet
+    for info, points in InstanceSet(source).instances(min_size, max_size):
+        yield info.name, sorted(set(map(tuple, points.tolist())))
+
+
+def instance_hash(points: List[Node]) -> str:
+    from util import instance_hash as hash_points
+    return hash_points(points)
+
+
+def run_one(solver_name: str, instance: str, points: List[Node], params: Optional[dict] = None,
+            quiet: bool = True, solution: Optional[List[Edge]] = None) -> dict:
+    """
+    Run one solver on one instance and return the result row. Errors of a solver
+    (e.g. a missing Gurobi license) are reported as status 'error' instead of raised.
+    :param solution: Optional warm start tour, given to the solvers in WARM_STARTS.
+    """
+    params = params or {}
+    warm_start = solution is not None and solver_name in WARM_STARTS
+    row = {'solver': solver_name, 'instance': instance, 'n': len(points), 'hash': instance_hash(points),
+           'params': params, 'warm_start': warm_start, 'status': 'ok', 'bottleneck': None, 'total': None,
+           'error': None}
+    start = time.perf_counter()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+            if warm_start:
+                solution, phases = SOLVERS[solver_name](points, solution=solution, **params)
+            else:
+                solution, phases = SOLVERS[solver_name](points, **params)
+        row['bottleneck'] = max(math.dist(*e) for e in solution) if solution else None
+        row.update({phase: phases.get(phase) for phase in PHASES})
+    except Exception as e:
+        row['status'] = 'error'
+        row['error'] = f"{type(e).__name__}: {e}"
+        if not quiet:
+            traceback.print_exc()
+    row['total'] = time.perf_counter() - start
+    return row
+
+
+def write_rows(rows: List[dict], path: str):
+    """
+    Write the result rows as CSV (for paths ending in '.csv') or as JSON lines.
+    """
+    if path.endswith(".csv"):
+        fields = ['solver', 'instance', 'n', 'hash', 'warm_start', 'status', 'bottleneck', 'total', *PHASES, 'params', 'error']
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fields, extrasaction='ignore')
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(dict(row, params=json.dumps(row['params'], sort_keys=True)))
+    else:
+        with open(path, "w") as f:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+
+def print_table(rows: List[dict]):
+    print(f"{'solver':<11} {'instance':<18} {'n':>4} {'status':<6} {'bottleneck':>11} {'total':>8} "
+          + " ".join(f"{phase:>8}" for phase in PHASES))
+    for row in rows:
+        cells = [f"{row[phase]:8.3f}" if row.get(phase) is not None else f"{'-':>8}" for phase in PHASES]
+        bottleneck = f"{row['bottleneck']:11.2f}" if row['bottleneck'] is not None else f"{'-':>11}"
+        print(f"{row['solver']:<11} {row['instance'][:18]:<18} {row['n']:>4} {row['status']:<6} {bottleneck} "
+              f"{row['total']:8.3f} " + " ".join(cells))
+
+
+def _run_isolated(report, solver_name: str, instance: str, points: List[Node], params: Optional[dict],
+                  solution: Optional[List[Edge]], quiet: bool) -> dict:
+    return run_one(solver_name, instance, points, params, quiet, solution)
+
+
+def run(solvers: List[str], instances: Iterator[Tuple[str, List[Node]]], params: Optional[Dict[str, dict]] = None,
+        quiet: bool = True, time_limit: Optional[float] = None, memory_limit: Optional[int] = None,
+        jobs: int = 1, warm_start: bool = False, cache: Optional[str] = None) -> List[dict]:
+    """
+    Run every solver on every instance. params maps solver names to keyword arguments.
+    With a time or memory limit, or more than one job, every run is a child process
+    (see isolation.run_many) and runs over a limit get the status 'timeout' or 'memout'.
+    With warm_start, the solvers in WARM_STARTS start from warm_start.warm_start_tour,
+    which is built once per instance (not part of the timings), with cache as directory
+    of a SolutionCache.
+    """
+    params = params or {}
+    if warm_start:
+        from alglab.warm_start import warm_start_tour, SolutionCache
+        solution_cache = SolutionCache(cache) if cache else None
+    runs = []
+    for instance, points in instances:
+        solution = warm_start_tour(points, solution_cache) if warm_start else None
+        runs.extend((solver_name, instance, points, params.get(solver_name), solution) for solver_name in solvers)
+    if time_limit is None and memory_limit is None and jobs == 1:
+        return [run_one(solver_name, instance, points, solver_params, quiet, solution)
+                for solver_name, instance, points, solver_params, solution in runs]
+
+    from alglab.isolation import run_many, OK
+    rows: List[Optional[dict]] = [None] * len(runs)
+    tasks = [(_run_isolated, (*run_args, quiet), {}) for run_args in runs]
+    for i, result in run_many(tasks, jobs, time_limit, memory_limit):
+        if result.status == OK:
+            rows[i] = result.value
+        else:
+            solver_name, instance, points, solver_params, solution = runs[i]
+            rows[i] = {'solver': solver_name, 'instance': instance, 'n': len(points),
+                       'hash': instance_hash(points), 'params': solver_params or {},
+                       'warm_start': solution is not None and solver_name in WARM_STARTS, 'status': result.status,
+                       'bottleneck': None, 'total': result.runtime, 'error': result.error,
+                       **{phase: None for phase in PHASES}}
+    return rows
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run the BTSP solvers of all sheets on the same instances.")
+    parser.add_argument("--solvers", nargs="+", default=list(SOLVERS), choices=list(SOLVERS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 20, 30])
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--instances", help="directory or archive of instance files, instead of random instances")
+    parser.add_argument("--max-size", type=int, help="largest instance to take from --instances")
+    parser.add_argument("--params", default="{}", help='JSON object of solver keyword arguments, '
+                                                       'e.g. \'{"sat": {"candidates": "knn"}}\'')
+    parser.add_argument("--time-limit", type=float, help="wall-clock limit per run in seconds")
+    parser.add_argument("--memory-limit", type=int, help="memory limit per run in MiB")
+    parser.add_argument("--jobs", type=int, default=1, help="number of runs at the same time")
+    parser.add_argument("--warm-start", action="store_true", help="start the exact solvers from a heuristic tour")
+    parser.add_argument("--cache", help="directory of the best known tours, for --warm-start")
+    parser.add_argument("--out", help="result file (.jsonl or .csv)")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the solvers")
+    args = parser.parse_args(argv)
+
+    if args.instances:
+        instances = file_instances(args.instances, max_size=args.max_size)
+    else:
+        instances = random_instances(args.sizes, args.seeds)
+    memory_limit = args.memory_limit * 2 ** 20 if args.memory_limit else None
+    rows = run(args.solvers, instances, json.loads(args.params), quiet=not args.verbose,
+               time_limit=args.time_limit, memory_limit=memory_limit, jobs=args.jobs,
+               warm_start=args.warm_start, cache=args.cache)
+    print_table(rows)
+    if args.out:
+        write_rows(rows, args.out)
+    return rows
+
+
+if __name__ == '__main__':
+    main()